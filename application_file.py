@@ -1,14 +1,40 @@
 import pandas as pd
-from dash import Dash, html, dcc, callback, Output, Input
+import numpy as np
+from dash import Dash, html, dcc, callback, Output, Input, State, clientside_callback
 import threading
 import time
 import random
-from datetime import datetime, timedelta
+import os
+import hashlib
+import sys
+import functools
+import multiprocessing
+import importlib.util
+import re
+from html import escape as html_escape
+import traceback
+from contextlib import contextmanager
+from collections import Counter
+import struct
+import mmap
+import json
+from collections import OrderedDict, namedtuple
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
+from datetime import datetime
 import requests
-from lxml import html as p_html
-from flask import Flask
+from lxml import etree
+from flask import Flask, Response, request, abort, redirect, send_from_directory
+import gzip
+try:
+    import brotli  # Optional, br bodies are only offered when it is installed
+except ImportError:
+    brotli = None
 import dash
 
+BASE_URL = os.environ.get("ECI_BASE_URL", "https://results.eci.gov.in/AcResultGenOct2024")
+
 party_colors = {
     "BJP": "#FF5722",
     "INC": "#1976D2",
@@ -18,226 +44,1134 @@ party_colors = {
     "Others": "#CCCCCC",
 }
 
+# Every election result page shares this row layout unless its config says otherwise: cells per row and
+# the cell of each column
+ELECTION_DEFAULTS = {
+    "row_cells": 31,
+    "columns": {"Constituency": 0, "Const. No.": 1, "Leading Candidate": 2, "Leading Party": 4,
+        "Trailing Candidate": 15, "Trailing Party": 17, "Margin": 28, "Round": 29, "Status": 30},
+    "palette": party_colors,
+    # Constituency detail pages (detail_url, %s is the Const. No.) are only crawled when the config has one,
+    # at most detail_budget pages per cycle over detail_workers connections
+    "detail_row_cells": 7,
+    "detail_columns": {"Candidate": 1, "Party": 2, "Votes": 5},
+    "detail_budget": 30,
+    "detail_workers": 2,
+}
+
+# Elections served by this process, RESULTS_ELECTIONS=<file.json> replaces them with {name: config}. A config
+# needs a title, the url pattern (%s is the page) and its pages, anything missing comes from ELECTION_DEFAULTS
+ELECTIONS = {
+    "haryana": {
+        "title": "Haryana Elections Results",
+        "url": BASE_URL + "/%s.htm",
+        "pages": ['statewiseS071', 'statewiseS072', 'statewiseS073', 'statewiseS074', 'statewiseS075'],
+        "detail_url": BASE_URL + "/ConstituencywiseS07%s.htm",
+    },
+}
+
+def load_elections(path):
+    if not path: return ELECTIONS
+    with open(path) as f:
+        return json.load(f)
+
+def make_session(max_workers):
+    # One pooled keep-alive session for every page, headers are sent from here
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+    session.headers.update({
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "Accept-Encoding": "gzip, deflate, br, zstd",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Connection": "keep-alive",
+        "DNT": "1",
+        "Priority": "u=1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "same-origin",
+        "Sec-Fetch-User": "?1",
+        "Sec-GPC": "1",
+        "TE": "trailers",
+        "Upgrade-Insecure-Requests": "1",
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:126.0) Gecko/20100101 Firefox/126.0"
+    })
+    return session
+
+class Metrics:
+    # Counters and histograms in the Prometheus text format, served on /metrics
+    time_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # name -> [buckets, cumulative bucket counts, sum, count]
+        self.collectors = []  # Called at scrape time, return (name, type, value, labels) samples
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=time_buckets):
+        with self.lock:
+            histogram = self.histograms.setdefault(name, [buckets, [0] * len(buckets), 0.0, 0])
+            for i, bound in enumerate(histogram[0]):
+                if value <= bound: histogram[1][i] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name + "_seconds", time.perf_counter() - start)
+
+    def timed(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self):
+        lines, samples = [], []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                samples.append((name, "counter", value, labels))
+            for name, (buckets, counts, total, count) in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for bound, value in zip(buckets, counts):
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {value}')
+                lines += [f'{name}_bucket{{le="+Inf"}} {count}', f"{name}_sum {total}", f"{name}_count {count}"]
+        for collector in self.collectors:
+            samples += collector()
+        typed = set()
+        for name, kind, value, labels in sorted(samples, key=lambda sample: sample[0]):
+            if name not in typed:
+                lines.append(f"# TYPE {name} {kind}")
+                typed.add(name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+class Sampler:
+    # Optional sampling profiler: counts the innermost frames of every other thread at a fixed interval
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.samples.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        me = threading.get_ident()
+        while self.running:
+            for ident, frame in sys._current_frames().items():
+                if ident == me: continue
+                stack = traceback.extract_stack(frame, limit=4)
+                self.samples[" <- ".join(f"{f.name} ({os.path.basename(f.filename)}:{f.lineno})" for f in reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def report(self, top=40):
+        total = sum(self.samples.values()) or 1
+        return "".join(f"{count / total:6.1%} {count:7d}  {stack}\n" for stack, count in self.samples.most_common(top))
+
+metrics = Metrics()
+sampler = Sampler()
+
+# One published version of the results and everything derived from it. Built by the scraper thread and swapped in
+# as a single reference, so a reader that takes data.current once never mixes two versions and needs no lock.
+# Nothing in it is modified after publishing
+Results = namedtuple("Results", "data version row_versions changes last_modified payload seats constituencies removed")
+
 class Data:
-    def __init__(self, check_interval=10):
-        self.data = pd.DataFrame()
-        self.last_df = pd.DataFrame()
-        self.last_modified = None
-        self.location = ['statewiseS071', 'statewiseS072', 'statewiseS073', 'statewiseS074', 'statewiseS075']
+    def __init__(self, check_interval=10, max_workers=5, fetch_timeout=8, max_backoff=120, quiet_every=3, autostart=True,
+                 name="haryana", config=None, pool=None, session=None):
+        # One election: its pages, row layout and palette come from its config (ELECTIONS[name] by default),
+        # the pool and session can be shared with other elections
+        config = {**ELECTION_DEFAULTS, **(ELECTIONS[name] if config is None else config)}
+        self.name = name
+        self.title = config["title"]
+        self.url = config["url"]
+        self.row_cells = config["row_cells"]
+        self.palette = config["palette"]
+        self.current = self.results(pd.DataFrame(), 0, {}, {}, None)
+        self.published = threading.Condition()  # Notified whenever a new version is published or details are stored
+        self.listeners = []  # Called with this Data after every published version
+        self.detail_listeners = []  # Called with this Data after every crawl that stored votes
+        self.location = list(config["pages"])
         self.dfs = {}
         self.headers = ['Constituency','Const. No.','Leading Candidate', 'Leading Party',
             'Trailing Candidate','Trailing Party','Margin', "Round","Status"]
+        self.columns = [config["columns"][header] for header in self.headers]  # Cell of each header in a row
         self.check_interval = check_interval
-        self.update()  # Initial data load
-        self.running = True  # Flag to control thread execution
+        self.fetch_timeout = fetch_timeout  # Per page from the start of its fetch, a slow page keeps its last good frame
+        self.pool = pool or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self.session = session or make_session(max_workers)
+        self.details = Details(self, config["detail_url"], config["detail_budget"], config["detail_row_cells"],
+            [config["detail_columns"][k] for k in ("Candidate", "Party", "Votes")], config["detail_workers"]) if config.get("detail_url") else None
+        self.validators = {}  # location -> (ETag, Last-Modified) of the last 200
+        self.page_size = {}  # location -> body size of the last 200
+        self.hashes = {}  # location -> fingerprint of the body behind self.dfs[location]
+        self.dirty = False  # Set when any page frame was rebuilt since the last concat
+        self.stats = {"200": 0, "304": 0, "unchanged": 0, "bytes_saved": 0}
+        self.lock = threading.Lock()
+        # Scheduler: fixed cadence, jittered backoff on errors, and per page state:
+        # active pages are polled every cycle, quiet ones every quiet_every cycles, final ones never again
+        self.max_backoff = max_backoff
+        self.quiet_every = quiet_every
+        self.churn_window = 2  # Cycles a page stays active after it changed
+        self.page_state = {location: "active" for location in self.location}
+        self.cycle = 0
+        self.last_change = {}  # location -> cycle of its last new frame
+        self.inflight = {}  # location -> future of its last fetch, not fetched again until that one is done
+        self.failed = set()  # Locations whose last fetch failed, retried on the next cycle
+        self.page_failures = {}  # location -> consecutive failures of the page itself (bad status, unparsable)
+        self.retry_cycle = {}  # location -> first cycle such a page is fetched again
+        self.fetched = 0  # Pages fetched in the last cycle
+        self.failures = 0  # Consecutive cycles with errors
+        self.retry_after = 0  # Largest Retry-After seen in the current cycle
+        self.active = threading.Event()  # Cleared while paused
+        self.active.set()
+        self.wake = threading.Event()  # Cuts the sleep short on pause/resume
+        self.next_run = time.monotonic()  # Start of the next cycle on the scheduler grid
+        self.schedule = {"cycles": 0, "errors": 0, "duration": 0.0, "lateness": 0.0, "max_lateness": 0.0, "delay": 0.0}
+        self.page = None
+        self.running = False  # Flag to control thread execution
+        if autostart: self.start()
+
+    def start(self):
+        # The first load runs on the thread as well, so callers (and the app import) never wait on the source
+        self.running = True
         self.thread = threading.Thread(target=self.run_check, daemon=True)
         self.thread.start()  # Start the thread
-        self.page = None
 
     def run_check(self):
         while self.running:
-            self.update()
-            time.sleep(self.check_interval)
+            if not self.active.is_set():
+                self.active.wait()
+                self.wake.clear()
+            self.run_cycle()
+            self.wake.wait(max(0.0, self.next_run - time.monotonic()))
+            self.wake.clear()
+
+    def run_cycle(self):
+        # Cycles start on a fixed grid of a monotonic clock so the fetch time does not add up as drift,
+        # after a failed cycle the next one waits a jittered, exponentially growing delay instead
+        started = time.monotonic()
+        lateness = max(0.0, started - self.next_run)
+        try:
+            errors = self.update()
+        except Exception as e:  # Counted as a failed cycle, the scheduler thread (shared by every election) lives on
+            print(f"Error in cycle {self.cycle} of {self.name}: {e}")
+            metrics.inc("results_cycle_errors_total", election=self.name)
+            errors = 1
+        finished = time.monotonic()
+        if errors:
+            self.failures += 1
+            ceiling = min(self.max_backoff, self.check_interval * 2 ** self.failures)
+            delay = max(random.uniform(self.check_interval, ceiling), self.retry_after)
+            self.next_run = finished + delay
+        else:
+            if self.fetched: self.failures = 0
+            self.next_run += self.check_interval
+            if self.next_run < finished:  # Overran, skip the missed slots rather than bursting
+                self.next_run += (finished - self.next_run) // self.check_interval * self.check_interval + self.check_interval
+        self.schedule.update(cycles=self.schedule["cycles"] + 1, errors=self.schedule["errors"] + errors,
+            duration=finished - started, lateness=lateness, max_lateness=max(self.schedule["max_lateness"], lateness),
+            delay=self.next_run - finished)
+
+    def pause(self):
+        self.active.clear()
+        self.wake.set()
+
+    def resume(self):
+        self.next_run = time.monotonic()  # Start a fresh grid
+        self.active.set()
+        self.wake.set()
 
     def update(self):
-        self.get_data()
-        if not self.data.empty and all(self.data["Status"] == "Result Declared"):
+        errors = self.get_data()
+        # Detail pages crawl on their own thread, pool and session, they never hold up or back off the statewise pages
+        if self.details: self.details.start()
+        if not self.data.empty and all(self.data["Status"] == "Result Declared") and not (self.details and self.details.due()):
             self.running = False  # Stop the thread
+        return errors
+
+    def due_locations(self):
+        return [
+            location for location in self.location
+            if self.cycle >= self.retry_cycle.get(location, 0) and (
+                location not in self.dfs or location in self.failed
+                or self.page_state.get(location, "active") == "active"
+                or self.page_state[location] == "quiet" and self.cycle % self.quiet_every == 0)
+        ]
+
+    def page_failed(self, location, error):
+        # Transport errors and 429/5xx mean the source is struggling: they count as cycle errors and back off the
+        # whole election. Anything else is this page's own problem, only the page waits 1, 2, 4... cycles
+        self.failed.add(location)
+        failures = self.page_failures[location] = self.page_failures.get(location, 0) + 1
+        metrics.inc("results_fetch_errors_total", election=self.name, location=location)
+        if is_transient(error): return 1
+        self.retry_cycle[location] = self.cycle + min(2 ** (failures - 1), max(1, self.max_backoff // self.check_interval))
+        return 0
+
+    def update_page_states(self):
+        # A page whose constituencies are all declared is final: its frame is frozen and never fetched again
+        with self.lock:
+            for location in self.location:
+                df = self.dfs.get(location)
+                if df is None or location in self.failed:
+                    self.page_state[location] = "active"
+                elif not df.empty and (df["Status"] == "Result Declared").all():
+                    self.page_state[location] = "final"
+                elif self.cycle - self.last_change.get(location, 0) <= self.churn_window:
+                    self.page_state[location] = "active"
+                else:
+                    self.page_state[location] = "quiet"
 
+    @metrics.timed("results_get_data")
     def get_data(self):
-        for location in self.location: self.fetch(location)
-        df = pd.concat(self.dfs.values()).fillna("")
+        # Fetch due pages in parallel, a failed, late or unchanged page keeps its last good frame in self.dfs.
+        # A page is late fetch_timeout after its fetch started (time queued behind other pages does not count),
+        # pages still queued once nothing of this cycle ran for a whole fetch_timeout are cancelled and stay due
+        self.cycle += 1
+        self.retry_after = 0
+        errors = 0
+        started = {}  # location -> monotonic time its fetch started
+        due = [location for location in self.due_locations() if not (location in self.inflight and not self.inflight[location].done())]
+        futures = {self.pool.submit(self.fetch, location, self.cycle, started): location for location in due}
+        self.inflight.update((location, future) for future, location in futures.items())
+        self.fetched = len(futures)
+        pending, stalled = set(futures), False
+        while pending:
+            now = time.monotonic()
+            late = [future for future in pending if futures[future] in started and now - started[futures[future]] >= self.fetch_timeout]
+            for future in late:
+                pending.discard(future)
+                errors += self.page_failed(futures[future], FuturesTimeout())
+            if late: print(f"Timed out fetching: {', '.join(futures[future] for future in late)}")
+            deadlines = [started[futures[future]] + self.fetch_timeout for future in pending if futures[future] in started]
+            if pending and not deadlines:
+                if stalled:  # The pool is held by late fetches
+                    for future in [future for future in pending if future.cancel()]:
+                        pending.discard(future)
+                        self.failed.add(futures[future])
+                    continue
+                stalled = True
+            else:
+                stalled = False
+            done, _ = wait(pending, timeout=min(deadlines, default=now + self.fetch_timeout) - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                location = futures[future]
+                try:
+                    future.result()
+                    self.failed.discard(location)
+                    self.page_failures.pop(location, None)
+                    self.retry_cycle.pop(location, None)
+                except Exception as e:
+                    errors += self.page_failed(location, e)
+                    print(f"Error fetching {location}: {e}")
+        self.update_page_states()
+        with self.lock:
+            if not self.dirty: return errors  # No page changed, skip concat, clean and compare
+            self.dirty = False
+            frames = list(self.dfs.values())
+        if not frames: return errors
+        df = pd.concat(frames).fillna("")
         df["Leading Party"] = df["Leading Party"].fillna("X")
         if not df.empty:
-            self.data = self.clean(df)
-            #self.data = self.data.sort_values(by="Margin", ascending=False)
-            if not self.data.equals(self.last_df):
-                print("UPDATED!!!", str(datetime.now()))
-                self.last_modified = int(time.time())  # Update last modified time
-                self.last_df = self.data.copy()
-        
-    def fetch(self, location):
-        try:
-            page = requests.get(
-                "https://results.eci.gov.in/AcResultGenOct2024/%s.htm" % location,
-                headers={
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                    "Accept-Encoding": "gzip, deflate, br, zstd",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "Connection": "keep-alive",
-                    "DNT": "1",
-                    "Priority": "u=1",
-                    "Referer": "https://results.eci.gov.in/AcResultGenOct2024/%s.htm" % location,
-                    "Sec-Fetch-Dest": "document",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-Site": "same-origin",
-                    "Sec-Fetch-User": "?1",
-                    "Sec-GPC": "1",
-                    "TE": "trailers",
-                    "Upgrade-Insecure-Requests": "1",
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:126.0) Gecko/20100101 Firefox/126.0"
-                }
-            )
-            #page.raise_for_status()  # Raise an error for bad responses
-        except requests.RequestException as e:
-            print(f"Error fetching data: {e}")
-        
-        tree = p_html.fromstring(page.text)
-        table = tree.xpath('/html/body/main/div/div[3]/div/table/tbody')[0]
-
-        stack = []
-        for row in table.findall(".//tr"):
-            txt = [r.text for r in row.findall(".//td")]
-            if len(txt) == 31:
-                final_row = txt[:3] + txt[4:5] + txt[15:16] + txt[17:18] + txt[-3:]
-                stack.append(final_row)
-
-        df = pd.DataFrame(data=stack, columns=self.headers)
-        self.dfs[location] = df
+            df = self.clean(df)
+            #df = df.sort_values(by="Margin", ascending=False)
+            current = self.current
+            changes = diff_results(current.data, df)
+            metrics.observe("results_changed_rows", len(changes), buckets=(0, 1, 5, 10, 25, 50, 100, 250, 1000))
+            if changes:
+                print("UPDATED!!!", str(datetime.now()), f"({len(changes)} constituencies)")
+                version = current.version + 1
+                row_versions = {**current.row_versions, **dict.fromkeys(changes, version)}
+                # Removed rows leave row_versions and are remembered with the version they went in, for deltas
+                removed = {k: v for k, v in current.removed.items() if k not in changes}
+                for const_no in [k for k, fields in changes.items() if fields == ["removed"]]:
+                    del row_versions[const_no]
+                    removed[const_no] = version
+                # clean() builds a new frame every cycle, the published one is never touched again
+                self.publish(self.results(df, version, row_versions, changes, int(time.time()), removed))
+        return errors
+
+    def results(self, df, version, row_versions, changes, last_modified, removed=None):
+        payload = figure_payload(df, self.palette)
+        constituencies = sorted(payload['Constituency'])
+        return Results(df, version, row_versions, changes, last_modified, payload, payload['seats'], constituencies, removed or {})
+
+    def publish(self, results):
+        self.current = results
+        with self.published:
+            self.published.notify_all()
+        for listener in self.listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                print(f"Error publishing version {results.version}: {e}")
+
+    def details_updated(self):
+        # The detail crawl stored votes after the version was published: same results version, new details version
+        with self.published:
+            self.published.notify_all()
+        for listener in self.detail_listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                print(f"Error publishing details version {self.details.version}: {e}")
+
+    def stamp(self):
+        # What browsers are told about: the results version, and the details version where there are details
+        return "%d.%d" % (self.version, self.details.version) if self.details else str(self.version)
 
+    # The current version, for readers that only need one field
+    data = property(lambda self: self.current.data)
+    version = property(lambda self: self.current.version)
+    row_versions = property(lambda self: self.current.row_versions)
+    changes = property(lambda self: self.current.changes)
+    last_modified = property(lambda self: self.current.last_modified)
+    payload = property(lambda self: self.current.payload)
+
+    def state(self):
+        # Everything a follower process needs to serve this version
+        current = self.current
+        return {"data": current.data, "version": current.version, "row_versions": current.row_versions,
+                "changes": current.changes, "last_modified": current.last_modified, "removed": current.removed,
+                "details": self.details.state() if self.details else None}
+
+    def warm_start(self, history):
+        # Serve the last recorded results until the first live refresh
+        df, row_versions, version, last_modified = history.latest(self.headers)
+        if df.empty: return
+        self.publish(self.results(self.decorate(df), version, row_versions, {}, last_modified))
+
+    def load_state(self, state):
+        if self.details and state.get("details"): self.details.load_state(state["details"])
+        self.publish(self.results(state["data"], state["version"], state["row_versions"], state["changes"], state["last_modified"],
+                                  state.get("removed")))
+
+    def wait_for_stamp(self, stamp, timeout=None):
+        # Block until the stamp differs from `stamp` or the timeout passes, return the current stamp
+        with self.published:
+            self.published.wait_for(lambda: self.stamp() != stamp, timeout=timeout)
+        return self.stamp()
+
+    def changed_rows(self, since, current=None):
+        # Rows of a version (the current one by default) changed after version `since`
+        current = current or self.current
+        versions = current.data["Const. No."].map(current.row_versions)
+        return current.data[versions > since]
+
+    def removed_rows(self, since, current=None):
+        # Const. Nos. of the rows removed after version `since` and not back since
+        current = current or self.current
+        return sorted(const_no for const_no, version in current.removed.items() if version > since)
+
+    def fetch(self, location, cycle=None, started=None):
+        # `cycle` is the cycle the fetch was submitted in, `started` gets the start time of the fetch
+        if started is not None: started[location] = time.monotonic()
+        cycle = self.cycle if cycle is None else cycle
+        url = self.url % location
+        headers = {"Referer": url}
+        etag, modified = self.validators.get(location, (None, None))
+        if location in self.dfs:  # Only revalidate pages we already hold a frame for
+            if etag: headers["If-None-Match"] = etag
+            if modified: headers["If-Modified-Since"] = modified
+        with metrics.span("results_fetch_network"):
+            page = self.session.get(url, headers=headers, timeout=self.fetch_timeout)
+        if page.status_code == 429 or page.status_code >= 500:  # Throttled or overloaded, back off
+            retry_after = page.headers.get("Retry-After", "")
+            if retry_after.isdigit(): self.retry_after = max(self.retry_after, int(retry_after))
+        if page.status_code != 304: page.raise_for_status()  # A 404/403 body is not a result table
+
+        with self.lock:
+            if page.status_code == 304:  # Unchanged, skip parsing and keep the last frame
+                self.stats["304"] += 1
+                self.stats["bytes_saved"] += self.page_size.get(location, 0)
+                return None
+            self.stats["200"] += 1
+            self.page_size[location] = len(page.content)
+            digest = hashlib.blake2b(page.content, digest_size=16).digest()
+            if location in self.dfs and self.hashes.get(location) == digest:
+                self.stats["unchanged"] += 1  # Same body as last time, the frame is still good
+                # The server may rotate validators for identical content, revalidate with the new ones
+                self.validators[location] = (page.headers.get("ETag"), page.headers.get("Last-Modified"))
+                return False
+
+        with metrics.span("results_fetch_parse"):
+            stack = parse_result_table(page.text, row_cells=self.row_cells, columns=self.columns)
+            df = pd.DataFrame(data=stack, columns=self.headers)
+            # A bad cell fails the page here, it keeps its last good frame instead of breaking clean() every cycle
+            margin = pd.to_numeric(df["Margin"].replace("-", "0"), errors="coerce")
+            if margin.isna().any(): raise ValueError(f"Unparsable Margin on {location}")
+            df["Margin"] = margin.astype(int)
+        with self.lock:  # Validators are only kept once the page parsed into a frame
+            if cycle < self.last_change.get(location, 0): return False  # A straggler, a newer frame is already held
+            self.dfs[location] = df
+            self.last_change[location] = cycle
+            self.hashes[location] = digest
+            self.validators[location] = (page.headers.get("ETag"), page.headers.get("Last-Modified"))
+            self.dirty = True
+        return True
+
+    @metrics.timed("results_clean")
     def clean(self, df):
         df["Margin"] = df["Margin"].replace("-", "0").astype(int)
-        df["Leading Party"] = df["Leading Party"].replace("", "X").apply(lambda x: "".join(r[0] for r in x.split(" ")))
-        df["Label"] = df["Constituency"].astype("str") + df["Status"].apply(lambda x: " (Declared)" if x == "Result Declared" else "") + " | " + df["Margin"].apply(lambda x: format_margin_indian_style(x)).astype("str") + " (" + df["Round"] + ") |  "  + df['Leading Candidate'] + " | " + df['Leading Party']
+        df["Leading Party"] = map_unique(df["Leading Party"].replace("", "X"), party_initials)
+        return self.decorate(df)
+
+    def decorate(self, df):
+        # Derived columns of an already cleaned table
+        declared = np.where(df["Status"] == "Result Declared", " (Declared)", "")
+        df["Label"] = df["Constituency"].astype("str") + declared + " | " + format_margin_indian_style_vec(df["Margin"]) + " (" + df["Round"] + ") |  "  + df['Leading Candidate'] + " | " + df['Leading Party']
+        df["Color"] = map_unique(df["Leading Party"], lambda party: self.palette.get(party, "#CCCCCC"))
+        # Few distinct values per column, categoricals keep them once (categories sort like the strings)
+        for column in ["Leading Party", "Trailing Party", "Status", "Color"]:
+            df[column] = df[column].astype("category")
         return df
     
+class Details:
+    # Candidate votes from the detail page of every constituency, crawled in the background after each statewise
+    # cycle on a small pool of its own: at most `budget` pages per crawl, the most recently changed constituencies
+    # first, and a page is only fetched again (conditionally) once its statewise row changed. Votes are one
+    # integer array per counted round, in the order the candidates were first seen
+    def __init__(self, d, url, budget=30, row_cells=7, columns=(1, 2, 5), workers=2):
+        self.d = d
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="details")
+        self.session = make_session(workers)
+        self.running = False  # A crawl is in progress
+        self.url = url
+        self.budget = budget
+        self.row_cells = row_cells
+        self.columns = list(columns)
+        self.candidates = {}  # Const. No. -> [(candidate, party), ...]
+        self.rounds = {}  # Const. No. -> {round: array of votes per candidate}
+        self.seen = {}  # Const. No. -> row version its page was last read at
+        self.validators = {}  # Const. No. -> ETag
+        self.hashes = {}  # Const. No. -> fingerprint of the last parsed body
+        self.failed = set()
+        self.version = 0  # Bumped whenever votes were stored
+        self.stats = {"200": 0, "304": 0, "unchanged": 0, "errors": 0}
+        self.lock = threading.Lock()
+
+    def due(self):
+        # Changed since their page was read, the longest unread first and then the most recent change,
+        # so a busy count cannot starve a constituency
+        rows = self.d.current.row_versions
+        due = [const_no for const_no, version in rows.items() if self.seen.get(const_no, -1) < version or const_no in self.failed]
+        due.sort(key=lambda const_no: (self.seen.get(const_no, -1), -rows[const_no]))
+        return due
+
+    def start(self):
+        # One crawl at a time, started by the scheduler without waiting for it
+        if self.running: return
+        self.running = True
+        threading.Thread(target=self.run, name="details-crawl", daemon=True).start()
+
+    def run(self):
+        version = self.version
+        try:
+            self.crawl()
+            # Votes stored after the results were published reach the snapshot and /events this way
+            if self.version != version: self.d.details_updated()
+        except Exception as e:
+            print(f"Error crawling details: {e}")
+        finally:
+            self.running = False
+
+    @metrics.timed("results_details_crawl")
+    def crawl(self):
+        # A crawl gets one check interval, pages not started by then are cancelled and stay due for the next one
+        current = self.d.current
+        if current.data.empty: return 0
+        rounds = dict(zip(current.data["Const. No."], current.data["Round"]))
+        futures = {
+            self.pool.submit(self.fetch, const_no, rounds[const_no], current.row_versions[const_no]): const_no
+            for const_no in self.due()[:self.budget] if const_no in rounds
+        }
+        errors = 0
+        try:
+            for future in as_completed(futures, timeout=max(self.d.check_interval, self.d.fetch_timeout)):
+                const_no = futures[future]
+                try:
+                    future.result()
+                    self.failed.discard(const_no)
+                except Exception as e:
+                    errors += 1
+                    self.failed.add(const_no)
+                    print(f"Error fetching details of {const_no}: {e}")
+        except FuturesTimeout:
+            for future in futures: future.cancel()
+        self.stats["errors"] += errors
+        return errors
+
+    def fetch(self, const_no, round_text, row_version):
+        url = self.url % const_no
+        headers = {"Referer": url}
+        if self.validators.get(const_no): headers["If-None-Match"] = self.validators[const_no]
+        page = self.session.get(url, headers=headers, timeout=self.d.fetch_timeout)
+        page.raise_for_status()
+        if page.status_code == 304:
+            self.stats["304"] += 1
+        else:
+            digest = hashlib.blake2b(page.content, digest_size=16).digest()
+            if self.hashes.get(const_no) == digest:
+                self.stats["unchanged"] += 1
+            else:
+                self.stats["200"] += 1
+                rows = parse_result_table(page.text, row_cells=self.row_cells, columns=self.columns)
+                self.store(const_no, round_number(round_text), rows)
+                self.hashes[const_no] = digest
+            self.validators[const_no] = page.headers.get("ETag")
+        self.seen[const_no] = row_version
+
+    def store(self, const_no, round_no, rows):
+        with self.lock:
+            candidates = self.candidates.setdefault(const_no, [])
+            index = {candidate: i for i, candidate in enumerate(candidates)}
+            totals = {}
+            for candidate, party, votes in rows:
+                if not candidate or candidate == "Total": continue
+                key = (candidate, party or "")
+                if key not in index:
+                    index[key] = len(candidates)
+                    candidates.append(key)
+                totals[index[key]] = int(votes or 0)
+            votes = array("l", bytes(array("l").itemsize * len(candidates)))
+            for i, total in totals.items(): votes[i] = total
+            self.rounds.setdefault(const_no, {})[round_no] = votes
+            self.version += 1
+
+    def progress(self, const_no):
+        # Rounds in order, and (candidate, party, votes after each round) per candidate
+        with self.lock:
+            candidates = list(self.candidates.get(const_no, ()))
+            rounds = sorted(self.rounds.get(const_no, {}).items())
+        return [r for r, _ in rounds], [
+            (candidate, party, [votes[i] if i < len(votes) else 0 for _, votes in rounds])
+            for i, (candidate, party) in enumerate(candidates)
+        ]
+
+    def state(self):
+        with self.lock:
+            return {"candidates": {k: list(v) for k, v in self.candidates.items()},
+                    "rounds": {k: dict(v) for k, v in self.rounds.items()}, "seen": dict(self.seen), "version": self.version}
+
+    def load_state(self, state):
+        with self.lock:
+            self.candidates, self.rounds, self.seen = state["candidates"], state["rounds"], state["seen"]
+            self.version = state["version"]
+
+def is_transient(error):
+    # The source is unreachable, slow, throttling or overloaded
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, FuturesTimeout))
+
+def round_number(text):
+    # "7/20" -> 7, no round yet is 0
+    head = str(text).split("/")[0].strip()
+    return int(head) if head.isdigit() else 0
+
+class Elections:
+    # Every configured election in one process: one fetch pool, one keep-alive session and one scheduler
+    # thread for all of them, while pages, versions, backoff and listeners stay per election
+    def __init__(self, configs, check_interval=10, max_workers=5, **options):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self.session = make_session(max_workers)
+        self.wake = threading.Event()  # Set on pause/resume of any election to re-plan the schedule
+        self.data = {}
+        for name, config in configs.items():
+            d = Data(check_interval, max_workers, autostart=False, name=name, config=config,
+                     pool=self.pool, session=self.session, **options)
+            d.wake = self.wake
+            self.data[name] = d
+        self.default = next(iter(self.data.values()))
+        self.running = False
+
+    def __iter__(self):
+        return iter(list(self.data.values()))
+
+    def get(self, name=None):
+        # None is the default (first) election, an unknown name is None
+        return self.default if not name else self.data.get(name)
+
+    def path(self, path, d):
+        # Files of the default election keep the configured name, the others get theirs before the extension
+        if not path or d is self.default: return path
+        root, ext = os.path.splitext(path)
+        return "%s.%s%s" % (root, d.name, ext)
+
+    def start(self):
+        self.running = True
+        for d in self: d.running = True
+        self.thread = threading.Thread(target=self.run_check, daemon=True)
+        self.thread.start()
+
+    def run_check(self):
+        # The election with the earliest next_run goes next, each keeps its own grid and backoff (Data.run_cycle).
+        # Cycles run one at a time, so the source never sees more than max_workers requests from this process
+        while self.running:
+            self.wake.clear()
+            if not any(d.running for d in self): return  # Every election is final
+            due = [d for d in self if d.running and d.active.is_set()]
+            if not due:
+                self.wake.wait()  # All paused
+                continue
+            d = min(due, key=lambda d: d.next_run)
+            if d.next_run > time.monotonic():
+                self.wake.wait(d.next_run - time.monotonic())
+                continue
+            d.run_cycle()
+
+class VersionedCache:
+    # Bounded LRU of values built from the current data version (figures, API bodies), cleared as soon as the version moves on
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.version = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, version, key, build):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+        value = build()
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = value
+                while len(self.entries) > self.maxsize: self.entries.popitem(last=False)
+        return value
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+class Snapshot:
+    # Data.state() in a file: a header with the version followed by a JSON body (data only, never code). The file
+    # is created 0600 and replaced atomically, readers memory-map it, refuse files another user owns or could
+    # write, and only decode when the header version moves on. Used to share results between the processes of
+    # one deployment (ideally on /dev/shm) and to warm-start on restart.
+    header = struct.Struct("<8sQQ")  # magic, results version, details version
+    magic = b"ECIRES03"
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+        self.inode = None
+        self.map = None
+        self.lock = threading.Lock()  # Written from the scheduler and from the detail crawl
+
+    def try_lead(self):
+        # Only one process holds the lock and runs the scraper, it is released when that process exits
+        import fcntl  # POSIX only, and only needed in shared mode
+        lock_file = os.fdopen(os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600), "r+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def write(self, data):
+        with self.lock:
+            state = data.state()
+            body = json.dumps(self.encode(data, state)).encode()
+            tmp = "%s.%d.tmp" % (self.path, os.getpid())
+            try:
+                os.unlink(tmp)  # Left over by a crash of this pid
+            except FileNotFoundError:
+                pass
+            with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+                f.write(self.header.pack(self.magic, state["version"], state["details"]["version"] if state["details"] else 0))
+                f.write(body)
+            os.replace(tmp, self.path)
+
+    def refresh(self, data):
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        if inode != self.inode:
+            with open(self.path, "rb") as f:
+                info = os.fstat(f.fileno())
+                if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o022):
+                    raise PermissionError(f"{self.path} is not owned and writable only by this user")
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.inode = inode
+        magic, version, details_version = self.header.unpack_from(self.map)
+        if magic != self.magic or (version, details_version) == (data.version, data.details.version if data.details else 0): return False
+        data.load_state(self.decode(data, json.loads(self.map[self.header.size:])))
+        return True
+
+    @staticmethod
+    def encode(data, state):
+        details = state["details"]
+        return {
+            "data": state["data"].reindex(columns=data.headers).to_dict(orient="split", index=False),
+            "version": state["version"],
+            "row_versions": state["row_versions"],
+            "changes": state["changes"],
+            "last_modified": state["last_modified"],
+            "removed": state["removed"],
+            "details": details and {
+                "candidates": details["candidates"],
+                "rounds": {k: {str(r): v.tolist() for r, v in rounds.items()} for k, rounds in details["rounds"].items()},
+                "seen": details["seen"],
+                "version": details["version"],
+            },
+        }
+
+    @staticmethod
+    def decode(data, body):
+        # The frame is rebuilt with its derived columns, tuples and arrays come back from JSON lists
+        frame = body["data"]
+        df = pd.DataFrame(frame["data"], columns=frame["columns"])
+        details = body["details"]
+        if details:
+            details = {
+                "candidates": {k: [tuple(c) for c in v] for k, v in details["candidates"].items()},
+                "rounds": {k: {int(r): array("l", v) for r, v in rounds.items()} for k, rounds in details["rounds"].items()},
+                "seen": details["seen"],
+                "version": details["version"],
+            }
+        return {"data": data.decorate(df) if not df.empty else df, "version": body["version"],
+                "row_versions": body["row_versions"], "changes": body["changes"],
+                "last_modified": body["last_modified"], "removed": body.get("removed", {}), "details": details}
+
+def run_shared(elections, path, listeners, starting=(), interval=1):
+    # Become the scraper of every election if no other process is, otherwise follow its snapshots on a thread (and
+    # take over if it dies). Listeners (per election name) only run in the scraping process, and `starting` is
+    # called there before the scraper starts: on the calling thread when leading right away, so a pool forked by
+    # it never inherits the import lock of this module from another thread
+    lead = Snapshot(path)
+    snapshots = {d.name: Snapshot(elections.path(path, d)) for d in elections}
+
+    def take_lead():
+        if not lead.try_lead(): return False
+        print(f"Scraping for all workers (pid {os.getpid()})")
+        for start in starting: start()
+        for d in elections:
+            d.listeners += [snapshots[d.name].write, *listeners[d.name]]
+            d.detail_listeners.append(snapshots[d.name].write)
+        elections.start()
+        return True
+
+    def follow():
+        while not take_lead():
+            for d in elections:
+                try:
+                    snapshots[d.name].refresh(d)
+                except Exception as e:
+                    print(f"Error reading shared results of {d.name}: {e}")
+            time.sleep(interval)
+
+    if not take_lead(): threading.Thread(target=follow, daemon=True).start()
+
+class History:
+    # Every changed row of every version. Appended to a JSON lines file and kept in memory per constituency
+    # as parallel arrays (time, version, margin, codes into one string table) so range queries are a bisect.
+    fields = ['Constituency', 'Leading Candidate', 'Leading Party', 'Trailing Candidate', 'Trailing Party', 'Round', 'Status']
+
+    def __init__(self, path=None):
+        self.path = path
+        self.strings = []
+        self.string_codes = {}
+        self.series = {}  # Const. No. -> {"t", "version", "margin", "codes"} arrays
+        self.offset = 0  # Bytes of the file already loaded, the file is only read when first needed
+        self.lock = threading.Lock()
+
+    def code(self, value):
+        code = self.string_codes.get(value)
+        if code is None:
+            code = self.string_codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def append(self, t, version, const_no, margin, values):
+        series = self.series.get(const_no)
+        if series is None:
+            series = self.series[const_no] = {"t": array("d"), "version": array("q"), "margin": array("q"), "codes": array("I")}
+        series["t"].append(t)
+        series["version"].append(version)
+        series["margin"].append(margin)
+        series["codes"].extend(self.code(value) for value in values)
+
+    def record(self, data):
+        # Data listener: append the rows changed in the version just published
+        current = data.current
+        if not current.changes: return
+        self.refresh()
+        rows = current.data[current.data["Const. No."].isin(list(current.changes))]
+        columns = [rows["Const. No."], rows["Margin"]] + [rows[field].astype(str) for field in self.fields]
+        lines = []
+        with self.lock:
+            for const_no, margin, *values in zip(*columns):
+                self.append(current.last_modified, current.version, const_no, int(margin), values)
+                lines.append(json.dumps([current.last_modified, current.version, const_no, int(margin), values]) + "\n")
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.writelines(lines)
+                    self.offset = f.tell()
+
+    def refresh(self):
+        # Load rows appended to the file since the last call (all of it the first time)
+        if not self.path or not os.path.exists(self.path): return
+        with self.lock, open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                self.append(*json.loads(line))
+            self.offset += end
+
+    def query(self, const_nos, start=None, end=None):
+        # Const. No. -> rows recorded between start and end (unix seconds, inclusive)
+        result = {}
+        with self.lock:
+            for const_no in const_nos:
+                series = self.series.get(const_no)
+                if series is None: continue
+                times = series["t"]
+                lo = bisect_left(times, start) if start is not None else 0
+                hi = bisect_right(times, end) if end is not None else len(times)
+                width = len(self.fields)
+                result[const_no] = [
+                    dict(zip(self.fields, (self.strings[c] for c in series["codes"][i * width:(i + 1) * width])),
+                         t=times[i], version=series["version"][i], Margin=series["margin"][i])
+                    for i in range(lo, hi)
+                ]
+        return result
+
+    def latest(self, headers):
+        # Last recorded row of every constituency as a cleaned table, with the row versions
+        self.refresh()
+        rows, row_versions, version, last_modified = [], {}, 0, None
+        width = len(self.fields)
+        with self.lock:
+            for const_no, series in self.series.items():
+                values = dict(zip(self.fields, (self.strings[c] for c in series["codes"][-width:])))
+                values["Const. No."], values["Margin"] = const_no, series["margin"][-1]
+                rows.append([values[header] for header in headers])
+                row_versions[const_no] = series["version"][-1]
+                version = max(version, series["version"][-1])
+                last_modified = max(last_modified or 0, int(series["t"][-1]))
+        return pd.DataFrame(rows, columns=headers), row_versions, version, last_modified
+
+# Field reported by the diff for each compared column
+DIFF_FIELDS = {
+    "Constituency": "name",
+    "Leading Candidate": "leader",
+    "Leading Party": "leader",
+    "Trailing Candidate": "trailer",
+    "Trailing Party": "trailer",
+    "Margin": "margin",
+    "Round": "round",
+    "Status": "status",
+}
+
+def diff_results(old, new, key="Const. No."):
+    # Const. No. -> sorted changed fields, for every row of new that is added or differs from old,
+    # and ["removed"] for every row of old that is missing from new
+    new = new.set_index(key)
+    columns = [c for c in DIFF_FIELDS if c in new.columns]
+    if old.empty:
+        return {k: sorted(set(DIFF_FIELDS.values())) for k in new.index}
+    old = old.set_index(key)
+    removed = old.index.difference(new.index)
+    old = old.reindex(new.index)
+    changed = old[columns].to_numpy(dtype=object) != new[columns].to_numpy(dtype=object)
+    changes = {
+        k: sorted({DIFF_FIELDS[c] for c, flag in zip(columns, row) if flag})
+        for k, row in zip(new.index, changed) if row.any()
+    }
+    changes.update((k, ["removed"]) for k in removed)
+    return changes
+
+# Statewise result rows have 31 cells, these are the ones behind Data.headers
+# The default row layout, cells of the columns in Data.headers order
+RESULT_ROW_CELLS = ELECTION_DEFAULTS["row_cells"]
+RESULT_COLUMNS = list(ELECTION_DEFAULTS["columns"].values())
+
+def parse_result_table(text, chunk_size=1 << 16, row_cells=RESULT_ROW_CELLS, columns=RESULT_COLUMNS):
+    # Stream the page and keep only the needed cells of each row of the first result table body,
+    # rows are dropped as soon as they are read so the full tree is never held in memory
+    parser = etree.HTMLPullParser(events=("start", "end"), tag=("tbody", "tr"))
+    stack, widths, seen_tbody, depth, done = [], set(), False, 0, False
+    for start in range(0, len(text), chunk_size):
+        if done: break
+        parser.feed(text[start:start + chunk_size])
+        for event, element in parser.read_events():
+            if element.tag == "tbody":
+                depth += 1 if event == "start" else -1
+                seen_tbody = True
+                done = event == "end" and depth == 0 and bool(stack)
+                if done: break
+                continue
+            if event != "end" or depth == 0: continue
+            txt = [td.text for td in element.iterfind(".//td")]
+            if len(txt) == row_cells:
+                stack.append([txt[i] for i in columns])
+            elif txt:
+                widths.add(len(txt))
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    parser.close()
+    if not seen_tbody:
+        raise ValueError("Result table not found, the page layout has changed")
+    if not stack and widths:
+        raise ValueError("Result rows have %s cells instead of %d, the table layout has changed"
+            % ("/".join(map(str, sorted(widths))), row_cells))
+    return stack
+
+def party_initials(party):
+    return "".join(r[0] for r in party.split(" ") if r)
+
+def map_unique(series, func):
+    # Apply func once per distinct value and broadcast the results back with the codes
+    codes, uniques = pd.factorize(series)
+    return pd.Series(np.array([func(u) for u in uniques], dtype=object)[codes], index=series.index)
+
+def format_margin_indian_style_vec(margins):
+    # Same grouping as format_margin_indian_style: zero pad to a common width, insert the commas
+    # at fixed positions (last three digits, then pairs) and strip the padding back off
+    m = margins.to_numpy()
+    if not len(m): return margins.astype(str)
+    width = max(len(str(m.max())), 3)
+    width += (width - 3) % 2
+    digits = np.char.zfill(m.astype(str), width).view("U1").reshape(len(m), width)
+    chars = np.insert(digits, list(range(width - 3, 0, -2)), ",", axis=1)
+    text = np.char.lstrip(chars.copy().view("U%d" % chars.shape[1]).ravel(), "0,")
+    return pd.Series(np.where(text == "", "0", text), index=margins.index)
+
 def format_margin_indian_style(margin):
     margin = str(margin)
     rev = margin[:-1][::-1]
     return ",".join([rev[e*2:e*2+2] for e, r in enumerate(rev[::2])])[::-1]+margin[-1]
 
-data = Data(check_interval=5)
+class SearchIndex:
+    # Built once per version for the dropdown search: one lowercased line per constituency (name, number,
+    # candidates, parties) for substring matches, and every word of those lines sorted for prefix lookups
+    fields = ["Constituency", "Const. No.", "Leading Candidate", "Leading Party", "Trailing Candidate", "Trailing Party"]
 
-# Initialize Flask app
-server = Flask(__name__)
-
-# Initialize Dash app
-app = Dash(__name__, server=server)
+    def __init__(self, current):
+        self.names, self.lines = [], []
+        if not current.data.empty:
+            rows = current.data.drop_duplicates("Constituency").set_index("Constituency", drop=False)
+            rows = rows.loc[list(dict.fromkeys(current.constituencies)), self.fields].astype(str)  # Sorted by name
+            self.names = rows.index.tolist()
+            self.lines = [" ".join(values).lower() for values in zip(*(rows[field] for field in self.fields))]
+        words = sorted((word, i) for i, line in enumerate(self.lines) for word in set(re.findall(r"\w+", line)))
+        self.words = [word for word, _ in words]
+        self.rows = [i for _, i in words]
 
-# Define layout for Dash
-app.layout = html.Div(style={'fontFamily': 'Arial, sans-serif', 'backgroundColor': '#f4f4f4', 'padding': '10px'}, children=[
-    html.H1(
-        html.A("Haryana Elections Results", href="https://www.youtube.com", target="_blank", style={'color': 'black', 'textDecoration': 'none'}),
-        style={'textAlign': 'center', 'marginBottom': '5px', 'fontSize': '28px', 'fontWeight': 'bold'}
-    ),
-    html.Div(
-        html.A(
-            "Subscribe on YouTube for support!",
-            href="https://www.youtube.com/@HaryanaAurHaryanvi?sub_confirmation=1",
-            target="_blank",
-            style={
-                'padding': '10px 20px',
-                'backgroundColor': '#1976D2',
-                'color': 'white',
-                'borderRadius': '5px',
-                'textDecoration': 'none',
-                'transition': 'background-color 0.3s',
-                'fontSize': '1.2rem',
-                'textAlign': 'center',
-                'display': 'inline-block',
-                'margin': '10px auto'
-            }
-        ),
-        style={'textAlign': 'center', 'marginBottom': '20px'}
-    ),
-    html.Div(id='last-update', style={'textAlign': 'center', 'marginTop': '10px', 'fontSize': '14px', 'color': '#555'}),
-    dcc.Graph(id='donut-chart', config={'displayModeBar': False}),
-    dcc.Dropdown(
-        id='constituency-dropdown',
-        options=[{'label': c, 'value': c} for c in data.data["Constituency"].sort_values()],
-        multi=True,
-        placeholder="Select Constituencies",
-        style={'width': '100%', 'padding': '1px', 'margin': '0 auto', 'marginBottom': '1px'}
-    ),
-    dcc.Graph(id='bar-graph', config={'staticPlot': True, 'scrollZoom': False, 'displayModeBar': False}),
-    dcc.Interval(
-        id='interval-component',
-        interval=5 * 1000,
-        n_intervals=0
-    ),
-    dcc.Store(id='intermediate-value', data=""),
-    dcc.Store(id='intermediate-value2', data=""),
-    html.Footer(style={'textAlign': 'center', 'marginTop': '20px', 'fontSize': '14px', 'color': '#777'}, children=[
-        html.A("© HaryanaAurHaryanvi - An initiative by Aacharya Veer Sain Shastri", 
-            href="https://www.youtube.com/@HaryanaAurHaryanvi?sub_confirmation=1", 
-            target="_blank", 
-            style={'color': '#777', 'textDecoration': 'none'})
-    ])
+    def search(self, query, limit=50):
+        # Constituencies with a word starting with the query first, then any other containing it, both in name order
+        query = " ".join(query.lower().split())
+        if not query: return list(range(min(limit, len(self.names))))
+        start, end = bisect_left(self.words, query), bisect_left(self.words, query + "\uffff")
+        hits = sorted(set(self.rows[start:end]))[:limit]
+        if len(hits) < limit:
+            found = set(hits)
+            for i, line in enumerate(self.lines):
+                if query in line and i not in found:
+                    hits.append(i)
+                    if len(hits) == limit: break
+        return hits
 
-])
+    def options(self, query, selected=(), limit=50):
+        hits = self.search(query, limit)
+        names = {self.names[i] for i in hits}
+        options = [{'label': self.names[i], 'value': self.names[i], 'search': self.lines[i]} for i in hits]
+        # Selected values must stay in the options or the dropdown drops them
+        return options + [{'label': name, 'value': name} for name in selected or () if name not in names]
 
-@app.callback(
-    [Output('bar-graph', 'figure'),
-     Output('donut-chart', 'figure'),
-     Output('last-update', 'children')],
-     Output('intermediate-value', 'data'),
-     Output('intermediate-value2', 'data'),
-    [Input('interval-component', 'n_intervals'),
-     Input('constituency-dropdown', 'value'),
-     Input('intermediate-value', 'data'),
-     Input('intermediate-value2', 'data')]
-)
-def update_graph(n, selected_constituencies, last_modified, last_selection):
-    # Update the DataFrame
-    df = data.data.copy()
-    if selected_constituencies is None: selected_constituencies = []
-
-    # Get the current time in UTC+5:30
-    current_time = datetime.utcnow() + timedelta(hours=5, minutes=30)
-    last_update_time = current_time.strftime('%Y-%m-%d %H:%M:%S')
-    last_update_text = f"Last updated: {last_update_time} IST"
-
-    #print(str(last_modified), str(data.last_modified))
-    #print(int(time.time() - int(data.last_modified)))
-    #print(data.data["Leading Party"].value_counts())
-    #print(data.last_df["Leading Party"].value_counts())
-
-    if str(last_modified) == str(data.last_modified) and selected_constituencies == last_selection:
-        #print("No update")
-        return dash.no_update, dash.no_update, last_update_text, dash.no_update, dash.no_update
-    
-    # Filter for the selected constituencies for the bar graph only
-    if selected_constituencies:
-        filtered_df = df[df['Constituency'].isin(selected_constituencies)].copy()
-    else:
-        filtered_df = df.copy()  # Show all data if no constituency is selected
+def figure_payload(df, palette=party_colors):
+    # Built once per data version: rows already sorted by Leading Party and then by Margin in descending
+    # order, and every column a plain list so callbacks never hand pandas objects to the JSON encoder
+    if df.empty:
+        return {'Constituency': [], 'Margin': [], 'Color': [], 'Label': [], 'seats': ([], [], [])}
+    df = df.sort_values(by=['Leading Party', 'Margin'], ascending=[False, False])
+    seat_counts = df['Leading Party'].value_counts()
+    seat_counts = seat_counts[seat_counts > 0]
+    parties = seat_counts.index.astype(str).tolist()
+    return {
+        'Constituency': df['Constituency'].tolist(),
+        'Margin': df['Margin'].tolist(),
+        'Color': df['Color'].astype(str).tolist(),
+        'Label': df['Label'].tolist(),
+        'seats': (parties, seat_counts.tolist(), [palette.get(party, "#CCCCCC") for party in parties]),
+    }
 
-    # Create a text label combining margin, constituency name, candidate name, and party name
-    #filtered_df.loc[:, 'Label'] = filtered_df.apply(lambda row: f"{row['Constituency']} | {row['Margin']} | {row['Leading Candidate']} | {row['Leading Party']}", axis=1)
+# The payload columns shipped to the browser once per version for the bar graph
+STORE_COLUMNS = ['Constituency', 'Margin', 'Color', 'Label']
 
-    # Sort by Leading Party and then by Margin in descending order
-    filtered_df.sort_values(by=['Leading Party', 'Margin'], ascending=[False, False], inplace=True)
+def build_bar_figure(payload, selection):
+    # Filter for the selected constituencies for the bar graph only, the payload order is kept
+    rows = range(len(payload['Constituency']))
+    if selection:
+        wanted = set(selection)
+        rows = [i for i in rows if payload['Constituency'][i] in wanted]
+    margins = [payload['Margin'][i] for i in rows]
 
-    # Calculate the maximum margin for the filtered DataFrame
-    max_margin = filtered_df['Margin'].max() if not filtered_df.empty else 0
+    # Calculate the maximum margin for the filtered rows
+    max_margin = max(margins, default=0)
 
     if max_margin == 0: max_margin = 1
-    # Handle case when selected_constituencies is None
-    if selected_constituencies is None:
-        selected_constituencies = []
 
     # Determine bar height based on selection
-    num_selected = len(selected_constituencies) if selected_constituencies else len(df)
+    num_selected = len(selection) if selection else len(payload['Constituency'])
     bar_height = max(150, num_selected * 30)  # Adjust height dynamically
 
     # Determine the text position based on the margin condition
     text_positions = [
         'inside' if margin >= 0.55 * max_margin else 'outside'
-        for margin in filtered_df['Margin']
+        for margin in margins
     ]
 
     # Create a horizontal bar chart using Plotly
-    bar_figure = {
+    return {
         'data': [{
-            'x': filtered_df['Margin'],
-            'y': filtered_df['Constituency'],
+            'x': margins,
+            'y': [payload['Constituency'][i] for i in rows],
             'type': 'bar',
             'orientation': 'h',
             'marker': {
-                'color': filtered_df['Leading Party'].apply(lambda x: party_colors.get(x, "#CCCCCC")),
+                'color': [payload['Color'][i] for i in rows],
                 'line': {'width': 0}  # Remove the border
             },
-            'text': filtered_df['Label'],
+            'text': [payload['Label'][i] for i in rows],
             'textposition': text_positions,
             #'hovertemplate': '%{text}<br>%{y} Constituency<br>Margin: %{x}<extra></extra>',
         }],
@@ -264,17 +1198,39 @@ def update_graph(n, selected_constituencies, last_modified, last_selection):
         }
     }
 
-    # Create the donut chart using the complete DataFrame
-    seat_counts = df['Leading Party'].value_counts()
-    
-    donut_figure = {
+def build_details_figure(constituency, rounds, candidates, palette=party_colors):
+    # One line per candidate, votes after each counted round, the leader first
+    candidates = sorted(candidates, key=lambda candidate: -candidate[2][-1] if candidate[2] else 0)
+    return {
+        'data': [{
+            'x': rounds,
+            'y': votes,
+            'type': 'scatter',
+            'mode': 'lines+markers',
+            'name': "%s (%s) %s" % (candidate, party_initials(party), format_margin_indian_style(votes[-1] if votes else 0)),
+            'line': {'color': palette.get(party_initials(party))},
+        } for candidate, party, votes in candidates],
+        'layout': {
+            'title': {'text': constituency},
+            'height': 300,
+            'xaxis': {'title': {'text': 'Round'}, 'dtick': 1},
+            'yaxis': {'title': {'text': 'Votes'}},
+            'margin': {'l': 40, 'r': 0, 't': 40, 'b': 30},
+        }
+    }
+
+def build_donut_figure(payload):
+    # Create the donut chart using the complete table
+    parties, seats, colors = payload['seats']
+
+    return {
         'data': [{
-            'values': seat_counts,
-            'labels': seat_counts.index,
+            'values': seats,
+            'labels': parties,
             'type': 'pie',
             'hole': 0.4,
             'marker': {
-                'colors': [party_colors.get(party, "#CCCCCC") for party in seat_counts.index]
+                'colors': colors
             },
             'hoverinfo': 'label+percent+value',
             'textinfo': 'label+value',
@@ -287,7 +1243,480 @@ def update_graph(n, selected_constituencies, last_modified, last_selection):
         }
     }
 
-    return bar_figure, donut_figure, last_update_text, str(data.last_modified), selected_constituencies
+def render_exports(folder, stem, title, figures, formats=("png", "svg")):
+    # Runs in the export process: all figures into one self-contained HTML page, and every figure into each
+    # image format when kaleido is installed. Files are written under temporary names and renamed into place
+    import plotly.io as pio
+    written = []
+
+    def write(filename, body):
+        path = os.path.join(folder, filename)
+        with open(path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(path + ".tmp", path)
+        written.append(filename)
+
+    parts = [pio.to_html(figure, full_html=False, include_plotlyjs=i == 0) for i, (kind, figure) in enumerate(figures)]
+    write(stem + ".html", ("<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>%s</title></head><body>%s</body></html>"
+        % (html_escape(title), "".join(parts))).encode())
+    if importlib.util.find_spec("kaleido") is None: return written
+    for kind, figure in figures:
+        for fmt in formats:
+            write("%s-%s.%s" % (stem, kind, fmt), pio.to_image(figure, format=fmt, width=1200, height=figure['layout'].get('height') or 700))
+    return written
+
+class Exporter:
+    # Static copies of the graphics of every published version in `folder`, for posting: <election>-v<version>.html
+    # with both figures and <election>-v<version>-<donut|bars>.<png|svg>. The listener only builds the figure dicts,
+    # rendering runs in a worker process, a version still queued when a newer one arrives is dropped, and only the
+    # newest `keep` versions of an election stay on disk
+    pattern = re.compile(r"^(?P<name>.+)-v(?P<version>\d+)(?P<suffix>(-[a-z]+)?\.(html|png|svg))$")
+
+    def __init__(self, folder, keep=5, workers=1):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.keep = keep
+        self.workers = workers
+        self.pool = None  # Only the process that scrapes renders, see start()
+        self.pending = {}  # Election name -> future of its newest export
+
+    def start(self):
+        # Called where the listeners are attached, before the scraper threads start
+        if self.pool: return
+        if importlib.util.find_spec("kaleido") is None:
+            print("kaleido is not installed, exporting HTML only (no PNG/SVG)")
+        import plotly.io  # Imported before the fork, the worker never has to
+        # Forked rather than spawned, a spawned worker would import this module and start scraping too
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("fork"))
+        self.pool.submit(int)  # A forking pool starts all its workers on the first submit
+
+    def export(self, d):
+        self.start()
+        current = d.current
+        figures = [("donut", build_donut_figure(current.payload)), ("bars", build_bar_figure(current.payload, ()))]
+        future = self.pool.submit(render_exports, self.folder, "%s-v%d" % (d.name, current.version), d.title, figures)
+        previous, self.pending[d.name] = self.pending.get(d.name), future
+        if previous: previous.cancel()  # Superseded before its render started
+        future.add_done_callback(functools.partial(self.exported, d.name, current.version))
+
+    def exported(self, name, version, future):
+        if future.cancelled(): return
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error exporting {name} version {version}: {e}")
+        self.prune(name)
+
+    def files(self, name):
+        # (version, suffix, filename) of the exports of one election
+        matches = (self.pattern.match(filename) for filename in os.listdir(self.folder))
+        return [(int(m["version"]), m["suffix"], m.group(0)) for m in matches if m and m["name"] == name]
+
+    def prune(self, name):
+        files = self.files(name)
+        kept = sorted({version for version, _, _ in files})[-self.keep:]
+        for version, _, filename in files:
+            if version not in kept: os.remove(os.path.join(self.folder, filename))
+
+    def latest(self, name, suffix):
+        return max((item for item in self.files(name) if item[1] == suffix), default=(0, None, None))[2]
+
+elections = Elections(load_elections(os.environ.get("RESULTS_ELECTIONS")), check_interval=5)
+data = elections.default  # Served when no election is asked for
+# RESULTS_HISTORY="" keeps the history in memory only
+history_path = os.environ.get("RESULTS_HISTORY", "results_history.jsonl")
+# RESULTS_SNAPSHOT="" disables the snapshot the app restarts from
+snapshot_path = os.environ.get("RESULTS_SNAPSHOT", "results_snapshot.bin")
+# RESULTS_EXPORTS="" disables the static graphics export
+exports_path = os.environ.get("RESULTS_EXPORTS", "exports")
+if exports_path and "fork" not in multiprocessing.get_all_start_methods():
+    print("Exports need the fork start method, which this platform lacks: exports disabled")
+    exports_path = ""
+exporter = Exporter(exports_path) if exports_path else None
+histories, listeners = {}, {}
+for d in elections:
+    # Serve the last good state right away (snapshot, else the history), live refreshes run in the background
+    histories[d.name] = History(elections.path(history_path, d))
+    path = elections.path(snapshot_path, d)
+    try:
+        restored = bool(path) and Snapshot(path).refresh(d)
+    except Exception as e:
+        print(f"Error reading snapshot {path}: {e}")
+        restored = False
+    if not restored: d.warm_start(histories[d.name])
+    snapshot = Snapshot(path) if path else None
+    listeners[d.name] = [histories[d.name].record] + ([snapshot.write] if snapshot else []) + ([exporter.export] if exporter else [])
+    if snapshot: d.detail_listeners.append(snapshot.write)  # Only the scraping process ever crawls details
+# RESULTS_SHARED=/dev/shm/<name> shares one scraper between all worker processes of a deployment
+if os.environ.get("RESULTS_SHARED"):
+    run_shared(elections, os.environ["RESULTS_SHARED"], listeners, [exporter.start] if exporter else [])
+else:
+    if exporter: exporter.start()
+    for d in elections: d.listeners += listeners[d.name]
+    elections.start()
+# Caches are versioned, so one per election. The figure cache only holds the per-version singletons (store, donut,
+# search index), detail figures have their own cache so one key per selection never evicts those
+figure_cache = {d.name: VersionedCache(maxsize=8) for d in elections}
+details_cache = {d.name: VersionedCache(maxsize=256) for d in elections}
+api_cache = {d.name: VersionedCache(maxsize=64) for d in elections}
+
+# Initialize Flask app
+server = Flask(__name__)
+
+def requested_election():
+    # ?election=<name> on every route, the default election without it
+    d = elections.get(request.args.get("election"))
+    if d is None: abort(404)
+    return d
+
+# Every open /events stream holds a server thread: serve with a threaded or async worker class (the Flask server
+# below is threaded, gunicorn needs --worker-class gthread or gevent). Streams end after this many seconds and the
+# browser reconnects after the retry delay, so a tab never pins a thread for longer
+EVENTS_LIFETIME = 300
+
+@server.route("/events")
+def events():
+    # Server-Sent Events: one message per published data version or stored details (Data.stamp), comments keep
+    # idle proxies open
+    d = requested_election()
+    def stream(stamp):
+        yield f"retry: 5000\ndata: {stamp}\n\n"
+        deadline = time.monotonic() + EVENTS_LIFETIME
+        while time.monotonic() < deadline:
+            latest = d.wait_for_stamp(stamp, timeout=min(15, deadline - time.monotonic()))
+            if latest == stamp:
+                yield ": keep-alive\n\n"
+                continue
+            stamp = latest
+            yield f"data: {stamp}\n\n"
+
+    return Response(stream(d.stamp()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+API_COLUMNS = ['Constituency', 'Const. No.', 'Leading Candidate', 'Leading Party',
+    'Trailing Candidate', 'Trailing Party', 'Margin', 'Round', 'Status']
+
+# Renderers get the Results the response is for, never the live Data fields
+
+def api_rows(d, current, since):
+    df = current.data if since is None else d.changed_rows(since, current)
+    return df[API_COLUMNS] if not df.empty else pd.DataFrame(columns=API_COLUMNS)
+
+def render_results_json(d, current, since):
+    # With since=, "removed" lists the Const. Nos. of rows gone after that version, so a client can drop them
+    rows = api_rows(d, current, since).to_json(orient="records")
+    removed = d.removed_rows(since, current) if since is not None else []
+    return '{"election": %s, "version": %d, "last_modified": %s, "since": %s, "rows": %s, "removed": %s}' % (
+        json.dumps(d.name), current.version, json.dumps(current.last_modified), json.dumps(since), rows, json.dumps(removed))
+
+def render_results_csv(d, current, since):
+    # CSV deltas only carry changed rows, removed rows are only reported by the JSON body
+    return api_rows(d, current, since).to_csv(index=False)
+
+def render_summary_json(d, current, since):
+    df = current.data
+    if df.empty: return json.dumps({"election": d.name, "version": current.version, "total": 0, "leading": {}, "declared": {}})
+    declared = df[df["Status"] == "Result Declared"]
+    parties, seats, _ = current.seats
+    return json.dumps({
+        "election": d.name,
+        "version": current.version,
+        "total": len(df),
+        "leading": dict(zip(parties, seats)),
+        "declared": {str(k): int(v) for k, v in declared["Leading Party"].value_counts().items() if v},
+    })
+
+def compress(body, encoding):
+    body = body.encode()
+    if encoding == "br": return brotli.compress(body)
+    if encoding == "gzip": return gzip.compress(body, compresslevel=6)
+    return body
+
+def api_response(kind, mimetype, render):
+    # Bodies are rendered and compressed once per (election, version, kind, since, encoding) and shared by all clients
+    d = requested_election()
+    since = request.args.get("since", type=int)
+    accepted = request.headers.get("Accept-Encoding", "")
+    encoding = "br" if brotli and "br" in accepted else "gzip" if "gzip" in accepted else None
+    current = d.current
+    tag = "%s-v%d-%s-%s-%s" % (d.name, current.version, kind, "all" if since is None else since, encoding or "identity")
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache", "ETag": '"%s"' % tag}
+    if request.if_none_match.contains(tag):
+        return Response(status=304, headers=headers)
+    body = api_cache[d.name].get(current.version, (kind, since, encoding), lambda: compress(render(d, current, since), encoding))
+    if encoding: headers["Content-Encoding"] = encoding
+    return Response(body, mimetype=mimetype, headers=headers)
+
+@server.route("/api/history.json")
+def history_json():
+    # ?const=12,13&start=<unix s>&end=<unix s>, margins and leaders over time for these constituencies
+    const_nos = [c for c in request.args.get("const", "").split(",") if c]
+    history = histories[requested_election().name]
+    history.refresh()  # Picks up rows written by the scraping process when this one is a follower
+    rows = history.query(const_nos, request.args.get("start", type=float), request.args.get("end", type=float))
+    return Response(json.dumps(rows), mimetype="application/json")
+
+@server.route("/api/results.json")
+def results_json():
+    return api_response("results-json", "application/json", render_results_json)
+
+@server.route("/api/results.csv")
+def results_csv():
+    return api_response("results-csv", "text/csv", render_results_csv)
+
+@server.route("/api/summary.json")
+def summary_json():
+    return api_response("summary-json", "application/json", render_summary_json)
+
+def collect_metrics():
+    samples = []
+    for d in elections:
+        election = (("election", d.name),)
+        samples.append(("results_version", "gauge", d.version, election))
+        samples += [("results_fetch_responses_total", "counter", d.stats[k], election + (("kind", k),)) for k in ("200", "304", "unchanged")]
+        samples.append(("results_fetch_bytes_saved_total", "counter", d.stats["bytes_saved"], election))
+        states = Counter(d.page_state.values())
+        samples += [("results_pages", "gauge", states.get(state, 0), election + (("state", state),)) for state in ("active", "quiet", "final")]
+        for key in ("cycles", "errors", "duration", "lateness", "max_lateness", "delay"):
+            samples.append(("results_schedule_" + key, "gauge", d.schedule[key], election))
+        if d.details:
+            samples += [("results_details_responses_total", "counter", d.details.stats[k], election + (("kind", k),)) for k in ("200", "304", "unchanged", "errors")]
+        for name, caches in (("figure", figure_cache), ("details", details_cache), ("api", api_cache)):
+            samples.append(("results_cache_hits_total", "counter", caches[d.name].hits, election + (("cache", name),)))
+            samples.append(("results_cache_misses_total", "counter", caches[d.name].misses, election + (("cache", name),)))
+    calls = metrics.counters.get(("results_callbacks_total", ()), 0)
+    no_update = metrics.counters.get(("results_callbacks_no_update_total", ()), 0)
+    samples.append(("results_callbacks_no_update_ratio", "gauge", no_update / calls if calls else 0.0, ()))
+    return samples
+
+metrics.collectors.append(collect_metrics)
+
+@server.route("/exports/<path:filename>")
+def export_file(filename):
+    # Versioned names never change content
+    if not exporter: abort(404)
+    return send_from_directory(exporter.folder, filename, max_age=365 * 24 * 3600)
+
+@server.route("/exports/latest/<kind>")
+def latest_export(kind):
+    # /exports/latest/page.html, /exports/latest/donut.png, ... redirect to the newest export of the election
+    if not exporter: abort(404)
+    suffix = ".html" if kind == "page.html" else "-" + kind
+    filename = exporter.latest(requested_election().name, suffix)
+    if filename is None: abort(404)
+    response = redirect("/exports/" + filename)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@server.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@server.route("/metrics/profile", methods=["GET", "POST"])
+def profile_endpoint():
+    # POST enable=1 starts the sampling profiler, enable=0 stops it, GET shows the hottest stacks so far.
+    # Only with RESULTS_PROFILE=1 and only from this machine, it costs CPU and shows code paths
+    if os.environ.get("RESULTS_PROFILE") != "1" or request.remote_addr not in ("127.0.0.1", "::1"):
+        abort(404)
+    if request.method == "POST":
+        sampler.start() if request.values.get("enable", "1") == "1" else sampler.stop()
+    state = "running" if sampler.running else "stopped"
+    return Response(f"profiler {state}\n" + sampler.report(), mimetype="text/plain")
+
+# Initialize Dash app
+app = Dash(__name__, server=server)
+
+# Define layout for Dash, the same for every election: /<election name> picks one, / is the default election
+def serve_layout():
+    return html.Div(style={'fontFamily': 'Arial, sans-serif', 'backgroundColor': '#f4f4f4', 'padding': '10px'}, children=[
+        dcc.Location(id='url', refresh=False),
+        html.H1(
+            html.A(data.title, id='title', href="https://www.youtube.com", target="_blank", style={'color': 'black', 'textDecoration': 'none'}),
+            style={'textAlign': 'center', 'marginBottom': '5px', 'fontSize': '28px', 'fontWeight': 'bold'}
+        ),
+        html.Div(
+            html.A(
+                "Subscribe on YouTube for support!",
+                href="https://www.youtube.com/@HaryanaAurHaryanvi?sub_confirmation=1",
+                target="_blank",
+                style={
+                    'padding': '10px 20px',
+                    'backgroundColor': '#1976D2',
+                    'color': 'white',
+                    'borderRadius': '5px',
+                    'textDecoration': 'none',
+                    'transition': 'background-color 0.3s',
+                    'fontSize': '1.2rem',
+                    'textAlign': 'center',
+                    'display': 'inline-block',
+                    'margin': '10px auto'
+                }
+            ),
+            style={'textAlign': 'center', 'marginBottom': '20px'}
+        ),
+        html.Div(id='last-update', style={'textAlign': 'center', 'marginTop': '10px', 'fontSize': '14px', 'color': '#555'}),
+        dcc.Graph(id='donut-chart', config={'displayModeBar': False}),
+        dcc.Dropdown(
+            id='constituency-dropdown',
+            options=[],  # Filled by search_constituencies, a page of matches at a time
+            multi=True,
+            search_order='original',  # Keep the ranking of the server
+            placeholder="Select Constituencies",
+            style={'width': '100%', 'padding': '1px', 'margin': '0 auto', 'marginBottom': '1px'}
+        ),
+        html.Div(id='candidate-details'),  # Votes per round of the selected constituencies
+        dcc.Graph(id='bar-graph', config={'staticPlot': True, 'scrollZoom': False, 'displayModeBar': False}),
+        dcc.Interval(
+            id='interval-component',
+            interval=5 * 1000,
+            n_intervals=0
+        ),
+        dcc.Store(id='data-version', data=None),  # Set from /events, the only trigger for a server refresh
+        dcc.Store(id='intermediate-value', data=""),
+        dcc.Store(id='results-store', data=None),  # Columns of the current version, filtered in the browser
+        html.Footer(style={'textAlign': 'center', 'marginTop': '20px', 'fontSize': '14px', 'color': '#777'}, children=[
+            html.A("© HaryanaAurHaryanvi - An initiative by Aacharya Veer Sain Shastri", 
+                href="https://www.youtube.com/@HaryanaAurHaryanvi?sub_confirmation=1", 
+                target="_blank", 
+                style={'color': '#777', 'textDecoration': 'none'})
+        ])
+
+    ])
+
+app.layout = serve_layout
+
+# Clock ticks in the browser, the same tick opens the /events stream of the page's election once
+# (or polls without EventSource)
+clientside_callback(
+    """
+    function(n) {
+        if (!window.resultsEvents && window.EventSource) {
+            var election = window.location.pathname.split('/').filter(Boolean).pop() || '';
+            window.resultsEvents = new EventSource('/events?election=' + encodeURIComponent(election));
+            window.resultsEvents.onmessage = function(e) {
+                dash_clientside.set_props('data-version', {data: e.data});
+            };
+        }
+        // Get the current time in UTC+5:30
+        var now = new Date(Date.now() + 5.5 * 3600 * 1000).toISOString();
+        var text = 'Last updated: ' + now.slice(0, 10) + ' ' + now.slice(11, 19) + ' IST';
+        return [text, window.EventSource ? dash_clientside.no_update : n];
+    }
+    """,
+    Output('last-update', 'children'),
+    Output('data-version', 'data'),
+    Input('interval-component', 'n_intervals'),
+)
+
+@app.callback(
+    Output('results-store', 'data'),
+    Output('donut-chart', 'figure'),
+    Output('title', 'children'),
+    Output('intermediate-value', 'data'),
+    Input('data-version', 'data'),
+    Input('url', 'pathname'),
+    State('intermediate-value', 'data')
+)
+@metrics.timed("results_update_graph")
+def update_graph(pushed_version, pathname, last_version):
+    d = page_election(pathname)
+    current = d.current  # One version for the whole response
+    version, payload = current.version, current.payload
+
+    metrics.inc("results_callbacks_total")
+    if str(last_version) == str(version):
+        #print("No update")
+        metrics.inc("results_callbacks_no_update_total")
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+    # Only a new data version reaches the server, the selection is applied in the browser
+    cache = figure_cache[d.name]
+    store = cache.get(version, ("store",), lambda: {k: payload[k] for k in STORE_COLUMNS})
+    donut_figure = cache.get(version, ("donut",), lambda: build_donut_figure(payload))
+
+    return store, donut_figure, d.title, str(version)
+
+def page_election(pathname):
+    return elections.get((pathname or "").strip("/").rsplit("/", 1)[-1]) or data
+
+# Detail pages are not shipped with results-store, they come from the server when selected (first four only)
+@app.callback(
+    Output('candidate-details', 'children'),
+    Input('constituency-dropdown', 'value'),
+    Input('data-version', 'data'),  # Also moves when only the details changed
+    State('url', 'pathname')
+)
+def update_details(selected_constituencies, pushed_version, pathname):
+    d = page_election(pathname)
+    if not selected_constituencies or d.details is None: return []
+    selection = tuple(selected_constituencies[:4])
+    current = d.current
+
+    def build():
+        const_nos = dict(zip(current.data["Constituency"], current.data["Const. No."]))
+        return [
+            dcc.Graph(figure=build_details_figure(name, *d.details.progress(const_nos[name]), d.palette), config={'displayModeBar': False})
+            for name in selection if name in const_nos
+        ]
+
+    return details_cache[d.name].get(current.version, (selection, d.details.version), build)
+
+# The layout carries no options, every search (and every new version) asks the server for the matches.
+# Options carry their index line as `search` so the browser's own filter keeps matches on candidates and parties
+@app.callback(
+    Output('constituency-dropdown', 'options'),
+    Input('constituency-dropdown', 'search_value'),
+    Input('intermediate-value', 'data'),
+    State('constituency-dropdown', 'value'),
+    State('url', 'pathname')
+)
+def search_constituencies(search_value, shown_version, selected_constituencies, pathname):
+    d = page_election(pathname)
+    current = d.current
+    index = figure_cache[d.name].get(current.version, ("search",), lambda: SearchIndex(current))
+    return index.options(search_value or "", selected_constituencies)
+
+# Same figure as build_bar_figure, from the columns in results-store, so a selection never leaves the browser
+clientside_callback(
+    """
+    function(store, selected) {
+        if (!store) return dash_clientside.no_update;
+        // Filter for the selected constituencies, the store is already sorted by party and margin
+        var wanted = selected && selected.length ? new Set(selected) : null;
+        var x = [], y = [], color = [], text = [], maxMargin = 0;
+        for (var i = 0; i < store.Constituency.length; i++) {
+            if (wanted && !wanted.has(store.Constituency[i])) continue;
+            x.push(store.Margin[i]);
+            y.push(store.Constituency[i]);
+            color.push(store.Color[i]);
+            text.push(store.Label[i]);
+            if (store.Margin[i] > maxMargin) maxMargin = store.Margin[i];
+        }
+        if (maxMargin == 0) maxMargin = 1;
+        var numSelected = wanted ? wanted.size : store.Constituency.length;
+        return {
+            data: [{
+                x: x, y: y, type: 'bar', orientation: 'h',
+                marker: {color: color, line: {width: 0}},
+                text: text,
+                textposition: x.map(function(m) { return m >= 0.55 * maxMargin ? 'inside' : 'outside'; })
+            }],
+            layout: {
+                height: Math.max(150, numSelected * 30),
+                xaxis: {title: '', range: [0, maxMargin * 1.1], autorange: false},
+                yaxis: {title: '', showticklabels: false},
+                bargap: 0.1,
+                transition: {duration: 2500, easing: 'cubic-in-out'},
+                showlegend: false,
+                margin: {l: 0, r: 0, t: 0, b: 0}
+            }
+        };
+    }
+    """,
+    Output('bar-graph', 'figure'),
+    Input('results-store', 'data'),
+    Input('constituency-dropdown', 'value'),
+)
 
 if __name__ == '__main__':
     app.title = "Haryana Elections!!!"  # Set the title of the tab
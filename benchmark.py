@@ -0,0 +1,518 @@
+import argparse
+import hashlib
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+parties = ["Bharatiya Janata Party", "Indian National Congress", "Indian National Lok Dal",
+    "Aam Aadmi Party", "Jannayak Janta Party", "Independent"]
+
+def make_cells(no, rev=0):
+    # One synthetic statewise row with the same layout as ECI: 31 cells
+    r = random.Random(no * 7919 + rev)
+    cells = [""] * 31
+    cells[0], cells[1], cells[2] = "Constituency %d" % no, str(no), "Candidate %d" % r.randint(0, 9)
+    cells[4] = r.choice(parties)
+    cells[15], cells[17] = "Runner %d" % no, r.choice(parties)
+    cells[28], cells[29] = str(r.randint(0, 99999)), "%d/%d" % (rev % 20, 20)
+    cells[30] = "Result Declared" if rev >= 20 else "Result in Progress"
+    return cells
+
+def make_page(page_no, rows=18, rev=0):
+    body = "".join(
+        "<tr>" + "".join("<td>%s</td>" % c for c in make_cells(page_no * rows + i + 1, rev)) + "</tr>"
+        for i in range(rows))
+    return ("<html><body><main><div><div></div><div></div><div><div><table>"
+            "<thead><tr><th>Constituency</th></tr></thead><tbody>%s</tbody>"
+            "</table></div></div></div></main></body></html>" % body).encode()
+
+def make_detail_page(no, rev=0):
+    # Constituency detail page: every candidate with votes that grow with the counting progress, then the total
+    r = random.Random(no)
+    rows, total = [], 0
+    for i in range(3 + no % 5):
+        votes = rev * r.randint(100, 5000)
+        total += votes
+        rows.append([str(i + 1), "Contestant %d-%d" % (no, i), r.choice(parties), str(votes), "0", str(votes), "0"])
+    rows.append(["", "Total", "", str(total), "0", str(total), ""])
+    body = "".join("<tr>" + "".join("<td>%s</td>" % c for c in row) + "</tr>" for row in rows)
+    return ("<html><body><table><thead><tr><th>S.N.</th></tr></thead><tbody>%s</tbody></table></body></html>" % body).encode()
+
+def make_table(app, d, rows, rev=0):
+    # Raw frame as get_data hands it to clean()
+    stack = [[cells[i] for i in app.RESULT_COLUMNS] for cells in (make_cells(no + 1, rev) for no in range(rows))]
+    return app.pd.DataFrame(data=stack, columns=d.headers)
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        stub = self.server
+        stub.hits += 1
+        time.sleep(stub.delay)
+        location = self.path.rsplit("/", 1)[-1].split(".")[0]
+        page = stub.source(location)
+        if page is None or isinstance(page, int):  # Missing page, or a bare error status
+            self.send_response(page or 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body, etag = page
+        if stub.etags and self.headers.get("If-None-Match") == etag:
+            stub.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if stub.etags: self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def synthetic_source(stub):
+    # Generated pages, stub.rev is the counting progress
+    def source(location):
+        digits = location[len(location.rstrip("0123456789")):]
+        if location.startswith("Constituencywise"):
+            no = int(digits[2:])  # After the state code
+            return make_detail_page(no, stub.rev), '"d%d-%d"' % (no, stub.rev)
+        page_no = int(digits or 0) % 1000
+        return make_page(page_no, stub.rows, stub.rev), '"%d-%d"' % (page_no, stub.rev)
+    return source
+
+def start_stub(delay=0.0, rows=18, etags=True, port=0):
+    stub = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    stub.delay, stub.rows, stub.rev, stub.etags = delay, rows, 0, etags
+    stub.hits = stub.not_modified = 0
+    stub.source = synthetic_source(stub)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return stub
+
+class Recording:
+    # Pages saved by `record`: <dir>/<location>/<unix ms>.htm, one file per change of the page
+    def __init__(self, path):
+        self.pages = {}
+        for location in sorted(os.listdir(path)):
+            folder = os.path.join(path, location)
+            if not os.path.isdir(folder): continue
+            stamps = sorted(int(name.split(".")[0]) for name in os.listdir(folder) if name.endswith(".htm"))
+            if stamps: self.pages[location] = [(stamp, os.path.join(folder, "%d.htm" % stamp)) for stamp in stamps]
+        if not self.pages: raise ValueError("No recordings found in %s" % path)
+        self.locations = list(self.pages)
+        self.start = min(stamps[0][0] for stamps in self.pages.values())
+        self.times = sorted({stamp - self.start for stamps in self.pages.values() for stamp, _ in stamps})
+        self.offset = 0  # ms since the first recording that the replay has reached
+
+    def source(self, location):
+        # The latest recording of the page at the current replay offset
+        stamps = self.pages.get(location)
+        if not stamps: return None
+        now = self.start + self.offset
+        current = [item for item in stamps if item[0] <= now] or stamps[:1]
+        stamp, path = current[-1]
+        with open(path, "rb") as f:
+            return f.read(), '"%d"' % stamp
+
+def load_app(stub):
+    # The app reads its source URL at import time, point it at the stub first and keep its state in memory
+    os.environ["ECI_BASE_URL"] = "http://127.0.0.1:%d" % stub.server_address[1]
+    os.environ["RESULTS_HISTORY"] = os.environ["RESULTS_SNAPSHOT"] = os.environ["RESULTS_EXPORTS"] = ""
+    import application_file
+    return application_file
+
+def bench_fetch(args):
+    stub = start_stub()
+    app = load_app(stub)
+    print(f"{'pages':>5} {'delay':>6} {'sequential':>11} {'concurrent':>11}")
+    for delay in args.delays:
+        stub.delay = delay
+        locations = ["statewiseS07%d" % (i + 1) for i in range(args.pages)]
+        timings = []
+        for workers in (1, args.pages):
+            d = app.Data(max_workers=workers, fetch_timeout=60, autostart=False)
+            d.location = locations
+            start = time.perf_counter()
+            for _ in range(args.cycles): d.get_data()
+            timings.append((time.perf_counter() - start) / args.cycles)
+        print(f"{args.pages:>5} {delay:>6.2f} {timings[0]:>10.3f}s {timings[1]:>10.3f}s")
+
+def bench_conditional(args):
+    # Half of the cycles see a new revision of every page, the rest are unchanged
+    stub = start_stub(rows=args.rows)
+    app = load_app(stub)
+    for etags in (False, True):
+        stub.etags = etags
+        d = app.Data(autostart=False)
+        start = time.perf_counter()
+        for cycle in range(args.cycles):
+            if cycle % 2 == 0: stub.rev += 1
+            d.get_data()
+        elapsed = (time.perf_counter() - start) / args.cycles
+        print(f"conditional GET {'on ' if etags else 'off'}: {elapsed * 1000:7.1f} ms/cycle, "
+              f"200={d.stats['200']} 304={d.stats['304']} unchanged={d.stats['unchanged']} "
+              f"bytes saved={d.stats['bytes_saved']}")
+
+def bench_details(args):
+    # Detail crawl after each statewise cycle: every second cycle counts a new round on every page,
+    # the budget spreads the changed constituencies over cycles and unchanged ones are not fetched again
+    stub = start_stub(delay=args.delay)
+    app = load_app(stub)
+    app.data.pause()
+    d = app.Data(max_workers=args.workers, fetch_timeout=60, autostart=False)
+    d.details.budget = args.budget
+    print(f"{'cycle':>5} {'due':>5} {'200':>5} {'304':>5} {'crawl ms':>9}")
+    for cycle in range(args.cycles):
+        if cycle % 2 == 0: stub.rev += 1
+        d.get_data()
+        due = len(d.details.due())
+        before = dict(d.details.stats)
+        start = time.perf_counter()
+        d.details.crawl()
+        elapsed = time.perf_counter() - start
+        print(f"{cycle:>5} {due:>5} {d.details.stats['200'] - before['200']:>5} "
+              f"{d.details.stats['304'] - before['304']:>5} {elapsed * 1000:>9.1f}")
+    rounds = sum(len(r) for r in d.details.rounds.values())
+    print(f"{len(d.details.rounds)} constituencies, {rounds} rounds stored, "
+          f"{sum(v.itemsize * len(v) for r in d.details.rounds.values() for v in r.values()) / 1024:.1f} KB of votes")
+
+def parse_full_tree(text):
+    # The original Data.fetch path: full DOM, absolute XPath, every cell of every row
+    from lxml import html as p_html
+    table = p_html.fromstring(text).xpath('/html/body/main/div/div[3]/div/table/tbody')[0]
+    stack = []
+    for row in table.findall(".//tr"):
+        txt = [r.text for r in row.findall(".//td")]
+        if len(txt) == 31:
+            stack.append(txt[:3] + txt[4:5] + txt[15:16] + txt[17:18] + txt[-3:])
+    return stack
+
+def bench_parse(args):
+    stub = start_stub()
+    app = load_app(stub)
+    print(f"{'rows':>6} {'page KB':>8} {'full tree':>10} {'streaming':>10}")
+    for rows in args.rows:
+        text = make_page(0, rows).decode()
+        results = []
+        for parse in (parse_full_tree, app.parse_result_table):
+            start = time.perf_counter()
+            for _ in range(args.repeat): parse(text)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            results.append(elapsed)
+        print(f"{rows:>6} {len(text) / 1024:>8.0f} {results[0] * 1000:>8.2f}ms {results[1] * 1000:>8.2f}ms")
+
+def clean_apply(df, format_margin_indian_style):
+    # The original Data.clean with per-row lambdas, plus the per-row colour lookup of update_graph
+    df["Margin"] = df["Margin"].replace("-", "0").astype(int)
+    df["Leading Party"] = df["Leading Party"].replace("", "X").apply(lambda x: "".join(r[0] for r in x.split(" ")))
+    df["Label"] = df["Constituency"].astype("str") + df["Status"].apply(lambda x: " (Declared)" if x == "Result Declared" else "") + " | " + df["Margin"].apply(lambda x: format_margin_indian_style(x)).astype("str") + " (" + df["Round"] + ") |  "  + df['Leading Candidate'] + " | " + df['Leading Party']
+    df["Color"] = df['Leading Party'].apply(lambda x: {}.get(x, "#CCCCCC"))
+    return df
+
+def bench_clean(args):
+    stub = start_stub()
+    app = load_app(stub)
+    d = app.Data(autostart=False)
+    print(f"{'rows':>7} {'apply':>10} {'vectorized':>11} {'MB before':>10} {'MB after':>9}")
+    for rows in args.rows:
+        raw = make_table(app, d, rows)
+        results = []
+        for clean in (lambda df: clean_apply(df, app.format_margin_indian_style), d.clean):
+            start = time.perf_counter()
+            for _ in range(args.repeat): df = clean(raw.copy())
+            results += [(time.perf_counter() - start) / args.repeat, df.memory_usage(deep=True).sum() / 2**20]
+        print(f"{rows:>7} {results[0] * 1000:>8.1f}ms {results[2] * 1000:>9.1f}ms {results[1]:>10.2f} {results[3]:>9.2f}")
+
+def figures_from_frame(df, selection, party_colors):
+    # The previous update_graph path: figures built straight from pandas objects
+    filtered_df = df[df['Constituency'].isin(selection)].copy() if selection else df.copy()
+    filtered_df.sort_values(by=['Leading Party', 'Margin'], ascending=[False, False], inplace=True)
+    max_margin = (filtered_df['Margin'].max() if not filtered_df.empty else 0) or 1
+    bar = {'data': [{'x': filtered_df['Margin'], 'y': filtered_df['Constituency'], 'type': 'bar', 'orientation': 'h',
+                     'marker': {'color': filtered_df['Color'], 'line': {'width': 0}}, 'text': filtered_df['Label'],
+                     'textposition': ['inside' if m >= 0.55 * max_margin else 'outside' for m in filtered_df['Margin']]}],
+           'layout': {'height': max(150, len(selection or df) * 30),
+                      'xaxis': {'title': '', 'range': [0, max_margin * 1.1], 'autorange': False},
+                      'yaxis': {'title': '', 'showticklabels': False}, 'bargap': 0.1,
+                      'transition': {'duration': 2500, 'easing': 'cubic-in-out'}, 'showlegend': False,
+                      'margin': {'l': 0, 'r': 0, 't': 0, 'b': 0}}}
+    seat_counts = df['Leading Party'].value_counts()
+    donut = {'data': [{'values': seat_counts, 'labels': seat_counts.index, 'type': 'pie', 'hole': 0.4,
+                       'marker': {'colors': [party_colors.get(p, "#CCCCCC") for p in seat_counts.index]},
+                       'hoverinfo': 'label+percent+value', 'textinfo': 'label+value', 'textfont': {'size': 16}}],
+             'layout': {'showlegend': False}}
+    return bar, donut
+
+def bench_callback(args):
+    # Figure build plus the JSON encoding Dash does for every callback response, without the figure cache
+    from plotly.io.json import to_json_plotly
+    stub = start_stub()
+    app = load_app(stub)
+    d = app.Data(autostart=False)
+    print(f"{'rows':>6} {'selected':>8} {'frame ms':>9} {'frame KB':>9} {'payload ms':>11} {'payload KB':>11}")
+    for rows in args.rows:
+        df = d.clean(make_table(app, d, rows))
+        selection = tuple(sorted(df['Constituency'].sample(min(args.selected, rows), random_state=1))) if args.selected else ()
+        payload = app.figure_payload(df)
+        paths = [lambda: figures_from_frame(df, selection, app.party_colors),
+                 lambda: (app.build_bar_figure(payload, selection), app.build_donut_figure(payload))]
+        results = []
+        for build in paths:
+            start = time.perf_counter()
+            for _ in range(args.repeat): body = to_json_plotly(build())
+            results += [(time.perf_counter() - start) / args.repeat, len(body)]
+        print(f"{rows:>6} {len(selection):>8} {results[0] * 1000:>9.2f} {results[1] / 1024:>9.1f} "
+              f"{results[2] * 1000:>11.2f} {results[3] / 1024:>11.1f}")
+
+def callback_body(deps, version, last_version=""):
+    # The update_graph request a browser sends when the data version changes
+    output = [d["output"] for d in deps if "results-store" in d["output"]][0]
+    ids = [part.rsplit(".", 1) for part in output.strip(".").split("...")]
+    return {"output": output, "outputs": [{"id": i, "property": p} for i, p in ids],
+            "inputs": [{"id": "data-version", "property": "data", "value": str(version)},
+                       {"id": "url", "property": "pathname", "value": "/"}],
+            "state": [{"id": "intermediate-value", "property": "data", "value": last_version}],
+            "changedPropIds": ["data-version.data"]}
+
+def bench_push(args):
+    # Simulated clients refreshing by polling every interval vs waiting for /events
+    import requests
+    from werkzeug.serving import make_server
+    stub = start_stub()
+    app = load_app(stub)
+    srv = make_server("127.0.0.1", 0, app.server, threaded=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    base = "http://127.0.0.1:%d" % srv.server_port
+    deps = requests.get(base + "/_dash-dependencies").json()
+
+    def refresh(session, counts, version, last_version):
+        # One update_graph round trip, returns the version the client now shows
+        counts["requests"] += 1
+        response = session.post(base + "/_dash-update-component", json=callback_body(deps, version, last_version))
+        counts["bytes"] += len(response.content)
+        if response.status_code == 204: return last_version
+        return response.json()["response"].get("intermediate-value", {}).get("data", last_version)
+
+    def poll_client(stop, counts):
+        # The old page: the interval fires a server callback every tick, mostly answered with no_update
+        session, shown = requests.Session(), ""
+        while not stop.wait(args.interval):
+            shown = refresh(session, counts, shown, shown)
+
+    def push_client(stop, counts):
+        session, shown = requests.Session(), ""
+        counts["requests"] += 1
+        events = session.get(base + "/events", stream=True, timeout=args.duration + 30)
+        for line in events.iter_lines():
+            if stop.is_set(): break
+            if line.startswith(b"data: "):
+                shown = refresh(session, counts, line[6:].decode(), shown)
+        events.close()
+
+    print(f"{args.clients} clients, {args.duration}s, results change every {args.change_every}s")
+    for name, client in (("poll", poll_client), ("push", push_client)):
+        stop, counts = threading.Event(), {"requests": 0, "bytes": 0}
+        threads = [threading.Thread(target=client, args=(stop, counts), daemon=True) for _ in range(args.clients)]
+        for t in threads: t.start()
+        start = time.time()
+        while time.time() - start < args.duration:
+            time.sleep(args.change_every)
+            stub.rev += 1
+        stop.set()
+        stub.rev += 1  # Wakes the push clients so they notice the stop
+        for t in threads: t.join(timeout=args.interval + 10)
+        print(f"{name}: {counts['requests'] / args.duration:7.1f} req/s, {counts['bytes'] / args.duration / 1024:8.1f} KB/s")
+
+def record(args):
+    # Save every change of the source pages to disk with its timestamp, for replay and benchmarks
+    import requests
+    session = requests.Session()
+    session.headers["User-Agent"] = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:126.0) Gecko/20100101 Firefox/126.0"
+    hashes = {}
+    while True:
+        for location in args.locations:
+            try:
+                page = session.get("%s/%s.htm" % (args.url, location), timeout=10)
+            except requests.RequestException as e:
+                print(f"Error fetching {location}: {e}")
+                continue
+            digest = hashlib.blake2b(page.content, digest_size=16).digest()
+            if page.status_code != 200 or hashes.get(location) == digest: continue
+            hashes[location] = digest
+            os.makedirs(os.path.join(args.out, location), exist_ok=True)
+            path = os.path.join(args.out, location, "%d.htm" % (time.time() * 1000))
+            with open(path, "wb") as f: f.write(page.content)
+            print("Recorded", path)
+        if args.once: break
+        time.sleep(args.interval)
+
+def replay(args):
+    # Serve recordings as the source, `--speed 60` plays an hour of counting in a minute
+    recording = Recording(args.recordings)
+    stub = start_stub(port=args.port)
+    stub.source = recording.source
+    started = time.time()
+    print("Replaying %d pages over %.0f min, run the app with ECI_BASE_URL=http://127.0.0.1:%d"
+          % (len(recording.locations), recording.times[-1] / 60000, stub.server_address[1]))
+    while recording.offset < recording.times[-1]:
+        time.sleep(0.5)
+        recording.offset = (time.time() - started) * 1000 * args.speed
+    print("Replay finished, serving the final pages")
+    while True: time.sleep(3600)
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentiles(values, points=(50, 95, 99)):
+    values = sorted(values) or [0.0]
+    return [values[min(len(values) - 1, int(len(values) * p / 100))] for p in points]
+
+def timed(func, into):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            into.append(time.perf_counter() - start)
+    return wrapper
+
+def bench_day(args):
+    # A whole counting day, as fast as possible: every step of the recordings (or of a synthetic election)
+    # is one scraper cycle followed by the update_graph call of every simulated client
+    stub = start_stub(rows=args.page_rows)
+    app = load_app(stub)
+    app.data.pause()
+    if args.recordings:
+        recording = Recording(args.recordings)
+        stub.source, locations, steps = recording.source, recording.locations, recording.times
+    else:
+        pages = -(-args.synthetic // args.page_rows)
+        locations, steps = ["statewiseS%d" % (1000 + i) for i in range(pages)], list(range(args.rounds + 1))
+    d = app.Data(max_workers=args.workers, fetch_timeout=60, autostart=False)
+    d.location = locations
+    app.elections.data[d.name] = d  # update_graph reads the Data of the registry
+    fetches, parses, cleans = [], [], []
+    d.fetch = timed(d.fetch, fetches)
+    d.clean = timed(d.clean, cleans)
+    app.parse_result_table = timed(app.parse_result_table, parses)
+    cycles, callbacks, memory = [], [], []
+    for step in steps:
+        if args.recordings: recording.offset = step
+        else: stub.rev = step
+        start = time.perf_counter()
+        d.get_data()
+        cycles.append(time.perf_counter() - start)
+        for client in range(args.clients):
+            start = time.perf_counter()
+            app.update_graph(step, "/", "")
+            callbacks.append(time.perf_counter() - start)
+        memory.append(rss_mb())
+    parse_total = sum(parses)
+    print(f"{len(steps)} cycles, {len(locations)} pages, {len(d.data)} constituencies, {args.clients} clients per cycle")
+    print("%-22s %9s %9s %9s" % ("ms", "p50", "p95", "p99"))
+    rows = [("cycle", cycles), ("fetch per page", fetches), ("parse per page", parses), ("clean per cycle", cleans),
+            ("update_graph", callbacks)]
+    for name, values in rows:
+        print("%-22s %9.2f %9.2f %9.2f" % ((name,) + tuple(v * 1000 for v in percentiles(values))))
+    print(f"network share of fetch: {max(0.0, 1 - parse_total / max(sum(fetches), 1e-9)):.0%}, "
+          f"figure cache hit rate: {app.figure_cache[d.name].hit_rate():.0%}")
+    print(f"RSS per cycle: first {memory[0]:.0f} MB, max {max(memory):.0f} MB, last {memory[-1]:.0f} MB")
+
+def bench_startup(args):
+    # Time from a fresh process to the app being importable (ready to serve), and to its first data,
+    # against a slow source: cold, then restarting from the snapshot the first run left behind
+    import subprocess
+    import tempfile
+    stub = start_stub(delay=args.delay)
+    folder = tempfile.mkdtemp()
+    env = dict(os.environ, ECI_BASE_URL="http://127.0.0.1:%d" % stub.server_address[1], RESULTS_HISTORY="",
+               RESULTS_SNAPSHOT=os.path.join(folder, "snapshot.bin"), RESULTS_EXPORTS=os.path.join(folder, "exports"))
+    code = ("import time; start = time.perf_counter(); import application_file as a; ready = time.perf_counter() - start\n"
+            "warm = a.data.version\n"
+            "while not a.data.version: time.sleep(0.01)\n"
+            "print('startup', ready, time.perf_counter() - start, warm)\n"
+            "time.sleep(0.5)  # Lets the scraper thread write its snapshot")
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"source delay {args.delay:.1f}s per page")
+    for run in ("cold", "snapshot"):
+        out = subprocess.run([sys.executable, "-c", code], env=env, cwd=here, capture_output=True, text=True).stdout
+        # The app logs to stdout as well, take the timings line
+        ready, first, warm = next(line for line in out.splitlines() if line.startswith("startup ")).split()[1:]
+        print(f"{run:>8}: serving after {float(ready):.2f}s, data after {float(first):.2f}s (version at import {warm})")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks, recording and replay for the results app")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    p = sub.add_parser("fetch", help="get_data cycle latency, sequential vs concurrent fetching")
+    p.add_argument("--pages", type=int, default=5)
+    p.add_argument("--cycles", type=int, default=3)
+    p.add_argument("--delays", type=float, nargs="+", default=[0.0, 0.1, 0.5, 1.0])
+    p.set_defaults(func=bench_fetch)
+    p = sub.add_parser("conditional", help="304 vs 200 counters and cycle time with ETag revalidation")
+    p.add_argument("--rows", type=int, default=200)
+    p.add_argument("--cycles", type=int, default=20)
+    p.set_defaults(func=bench_conditional)
+    p = sub.add_parser("details", help="bounded detail page crawl per cycle, with budget and revalidation")
+    p.add_argument("--cycles", type=int, default=8)
+    p.add_argument("--budget", type=int, default=30)
+    p.add_argument("--workers", type=int, default=5)
+    p.add_argument("--delay", type=float, default=0.05)
+    p.set_defaults(func=bench_details)
+    p = sub.add_parser("parse", help="streaming result table parser vs the full lxml tree")
+    p.add_argument("--rows", type=int, nargs="+", default=[18, 200, 2000, 20000])
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_parse)
+    p = sub.add_parser("clean", help="per-row apply vs vectorized clean() over synthetic tables")
+    p.add_argument("--rows", type=int, nargs="+", default=[90, 543, 5000, 100000])
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_clean)
+    p = sub.add_parser("callback", help="update_graph figure build and JSON encoding, frame vs per-version payload")
+    p.add_argument("--rows", type=int, nargs="+", default=[90, 543, 5000])
+    p.add_argument("--selected", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_callback)
+    p = sub.add_parser("push", help="load test: request rate of polling clients vs /events push")
+    p.add_argument("--clients", type=int, default=50)
+    p.add_argument("--duration", type=float, default=60)
+    p.add_argument("--interval", type=float, default=5)
+    p.add_argument("--change-every", type=float, default=30)
+    p.set_defaults(func=bench_push)
+    p = sub.add_parser("record", help="record every change of the source pages to disk")
+    p.add_argument("--url", default=os.environ.get("ECI_BASE_URL", "https://results.eci.gov.in/AcResultGenOct2024"))
+    p.add_argument("--locations", nargs="+", default=["statewiseS07%d" % i for i in range(1, 6)])
+    p.add_argument("--out", default="recordings")
+    p.add_argument("--interval", type=float, default=15)
+    p.add_argument("--once", action="store_true")
+    p.set_defaults(func=record)
+    p = sub.add_parser("replay", help="serve recordings on a real-time or compressed schedule")
+    p.add_argument("recordings")
+    p.add_argument("--port", type=int, default=18090)
+    p.add_argument("--speed", type=float, default=1)
+    p.set_defaults(func=replay)
+    p = sub.add_parser("day", help="end-to-end counting day: fetch, parse, clean, callbacks and memory per cycle")
+    p.add_argument("--recordings", help="directory written by `record`, synthetic election otherwise")
+    p.add_argument("--synthetic", type=int, default=90, help="constituencies of the synthetic election")
+    p.add_argument("--page-rows", type=int, default=18)
+    p.add_argument("--rounds", type=int, default=25)
+    p.add_argument("--workers", type=int, default=5)
+    p.add_argument("--clients", type=int, default=20)
+    p.set_defaults(func=bench_day)
+    p = sub.add_parser("startup", help="time to serve and to first data, cold vs from the restart snapshot")
+    p.add_argument("--delay", type=float, default=2.0)
+    p.set_defaults(func=bench_startup)
+    args = parser.parse_args()
+    args.func(args)
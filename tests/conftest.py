@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import benchmark
+
+
+@pytest.fixture(scope="session")
+def stub():
+    return benchmark.start_stub(rows=18)
+
+
+@pytest.fixture(scope="session")
+def app(stub):
+    app = benchmark.load_app(stub)
+    # Stop the app's own scraper, only the Data of each test talks to the stub
+    app.elections.running = False
+    app.elections.wake.set()
+    app.elections.thread.join(timeout=30)
+    while any(d.details and d.details.running for d in app.elections): time.sleep(0.05)
+    return app
+
+
+@pytest.fixture
+def data(app, stub):
+    stub.rev, stub.etags, stub.source = 0, True, benchmark.synthetic_source(stub)
+    d = app.Data(autostart=False)
+    d.location = d.location[:2]
+    d.churn_window = 1000  # Every page stays active, polled every cycle
+    return d
+
+
+@pytest.fixture
+def parses(app, monkeypatch):
+    calls = []
+    parse = app.parse_result_table
+    monkeypatch.setattr(app, "parse_result_table", lambda *args, **kwargs: calls.append(1) or parse(*args, **kwargs))
+    return calls
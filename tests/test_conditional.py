@@ -0,0 +1,49 @@
+import benchmark
+
+
+def test_not_modified_skips_parse(data, stub, parses):
+    data.get_data()
+    assert data.stats["200"] == 2 and data.stats["304"] == 0
+    assert len(parses) == 2
+    version, size = data.version, sum(data.page_size.values())
+
+    data.get_data()
+    assert data.stats["200"] == 2 and data.stats["304"] == 2
+    assert data.stats["bytes_saved"] == size
+    assert len(parses) == 2  # 304s never reach the parser
+    assert data.version == version
+
+    stub.rev += 1
+    data.get_data()
+    assert data.stats["200"] == 4 and len(parses) == 4
+    assert data.version == version + 1
+
+
+def test_rotated_etag_same_body(data, stub, parses):
+    # Identical bodies under a new ETag every request: parsed once, then revalidated with the latest ETag
+    source, served = benchmark.synthetic_source(stub), []
+
+    def rotating(location):
+        body, _ = source(location)
+        served.append('"e%d"' % len(served))
+        return body, served[-1]
+
+    stub.source = rotating
+    data.get_data()
+    for _ in range(3):
+        data.get_data()
+    assert data.stats["200"] == 8 and data.stats["unchanged"] == 6 and data.stats["304"] == 0
+    assert len(parses) == 2
+    assert {etag for etag, _ in data.validators.values()} == set(served[-2:])
+
+    stub.source = lambda location: (source(location)[0], data.validators[location][0])
+    data.get_data()
+    assert data.stats["304"] == 2 and len(parses) == 2
+
+
+def test_no_etags_falls_back_to_hash(data, stub, parses):
+    stub.etags = False
+    data.get_data()
+    data.get_data()
+    assert data.stats["304"] == 0 and data.stats["unchanged"] == 2
+    assert len(parses) == 2
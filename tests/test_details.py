@@ -0,0 +1,33 @@
+import time
+
+
+def test_crawl_never_holds_up_statewise_pages(data, stub):
+    stub.delay = 0.3
+    try:
+        data.fetch_timeout, data.check_interval = 1, 1
+        data.details.budget = 20
+        assert data.details.pool is not data.pool and data.details.session is not data.session
+        assert data.update() == 0
+        assert data.details.running  # The crawl runs in the background
+        assert data.update() == 0
+        assert not data.failed  # The statewise pages did not queue behind the detail pages
+        while data.details.running: time.sleep(0.05)
+        assert data.details.stats["errors"] == 0
+    finally:
+        stub.delay = 0
+
+
+def test_stored_votes_reach_the_snapshot(app, data, tmp_path):
+    # The crawl ends after the version was published, its votes are written and announced on their own
+    snapshot = app.Snapshot(str(tmp_path / "snapshot.bin"))
+    data.listeners.append(snapshot.write)
+    data.detail_listeners.append(snapshot.write)
+    data.update()
+    stamp = data.stamp()
+    while data.details.running: time.sleep(0.05)
+    assert data.details.version > 0
+    assert data.wait_for_stamp(stamp, timeout=0) == "%d.%d" % (data.version, data.details.version)
+
+    follower = app.Data(autostart=False)
+    assert snapshot.refresh(follower)
+    assert follower.details.version == data.details.version and follower.details.rounds == data.details.rounds
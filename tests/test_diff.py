@@ -0,0 +1,26 @@
+import json
+
+
+def test_removed_rows_are_reported(app, data):
+    data.get_data()
+    page = data.location[0]
+    frame, first = data.dfs[page], data.version
+    before, dropped = set(data.row_versions), set(frame["Const. No."].iloc[12:])
+    assert len(before) == 36 and len(dropped) == 6
+
+    data.dfs[page] = frame.iloc[:12]  # The page lost its last rows
+    data.dirty = True
+    data.get_data()
+    assert data.changes == {k: ["removed"] for k in dropped}
+    assert set(data.row_versions) == before - dropped
+    assert set(data.changed_rows(0)["Const. No."]) == before - dropped
+
+    delta = json.loads(app.render_results_json(data, data.current, first))
+    assert delta["rows"] == [] and set(delta["removed"]) == dropped
+    assert json.loads(app.render_results_json(data, data.current, data.version))["removed"] == []
+
+    data.dfs[page] = frame  # Back again: a changed row, no longer removed
+    data.dirty = True
+    data.get_data()
+    delta = json.loads(app.render_results_json(data, data.current, first))
+    assert delta["removed"] == [] and {row["Const. No."] for row in delta["rows"]} == dropped
@@ -0,0 +1,87 @@
+import time
+
+import benchmark
+
+
+def serve(stub, statuses):
+    # Pages named in statuses answer with that status (None is a 404), the rest with the synthetic tables
+    source = benchmark.synthetic_source(stub)
+
+    def handler(location):
+        if location in statuses: return statuses[location]
+        return source(location)
+
+    stub.source = handler
+
+
+def test_broken_page_does_not_back_off_the_cycle(data, stub):
+    broken, healthy = data.location
+    serve(stub, {broken: None})  # 404
+    assert data.get_data() == 0
+    assert broken in data.failed and healthy in data.dfs
+    assert data.page_failures[broken] == 1
+    assert data.due_locations() == [healthy]  # The broken page sits out the next cycle only
+
+    data.get_data()
+    assert data.get_data() == 0
+    assert data.page_failures[broken] == 2
+    assert broken not in data.due_locations()
+
+    serve(stub, {})
+    data.cycle = data.retry_cycle[broken] - 1  # get_data starts the cycle the page is due again
+    data.get_data()
+    assert broken in data.dfs and broken not in data.failed and broken not in data.page_failures
+
+
+def test_unparsable_page_does_not_back_off_the_cycle(data, stub):
+    broken = data.location[0]
+    serve(stub, {broken: (b"<html><body>Maintenance</body></html>", '"m"')})
+    assert data.get_data() == 0
+    assert data.page_failures[broken] == 1
+
+
+def test_bad_margin_keeps_the_last_good_frame(data, stub):
+    broken = data.location[0]
+    data.get_data()
+    good, version = data.dfs[broken], data.version
+    cells = benchmark.make_cells(1)
+    cells[28] = ""  # Empty Margin
+    row = "<tr>" + "".join("<td>%s</td>" % c for c in cells) + "</tr>"
+    serve(stub, {broken: (("<html><body><table><tbody>%s</tbody></table></body></html>" % row).encode(), '"bad"')})
+    assert data.get_data() == 0
+    assert data.page_failures[broken] == 1
+    assert data.dfs[broken] is good and data.version == version
+
+
+def test_cycle_error_backs_off_instead_of_raising(data, monkeypatch):
+    monkeypatch.setattr(data, "clean", lambda df: 1 / 0)
+    data.run_cycle()
+    assert data.failures == 1 and data.schedule["errors"] == 1
+
+
+def test_overloaded_source_backs_off(data, stub):
+    serve(stub, {location: 503 for location in data.location})
+    assert data.get_data() == 2
+    assert data.retry_cycle == {}
+
+
+def test_time_queued_does_not_count_against_a_page(data, stub):
+    # 12 pages on 5 workers at 0.4 s each: every page answers well within its own timeout
+    data.location = ["statewiseS07%02d" % i for i in range(1, 13)]
+    data.fetch_timeout, stub.delay = 1, 0.4
+    try:
+        assert data.get_data() == 0
+        assert data.get_data() == 0
+        assert not data.failed and len(data.dfs) == 12
+    finally:
+        stub.delay = 0
+
+
+def test_straggler_is_not_fetched_twice(app, data, monkeypatch):
+    parse = app.parse_result_table
+    monkeypatch.setattr(app, "parse_result_table", lambda *args, **kwargs: time.sleep(0.6) or parse(*args, **kwargs))
+    data.fetch_timeout = 0.2
+    assert data.get_data() == 2  # Both pages late, their fetches still run
+    assert data.get_data() == 0 and data.fetched == 0
+    while not all(future.done() for future in data.inflight.values()): time.sleep(0.05)
+    assert len(data.dfs) == 2 and set(data.last_change.values()) == {1}  # Stamped with the cycle they were started in